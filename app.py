@@ -3,7 +3,6 @@ from flask_cors import CORS
 from openai import OpenAI
 import json
 import os
-from typing import Dict, Any
 import uuid
 import requests
 from urllib.parse import urlparse
@@ -20,26 +19,25 @@ load_dotenv()
 # Import video analysis components
 import sys
 sys.path.append('.')
-from utils.video_utils import read_video, save_video
-from trackers.player_tracker import PlayerTracker
-from trackers.ball_tracker import BallTracker  
-from court_detector.court_detector import CourtLineDetector
+from court_detector import CourtLineDetector, CourtKeypointTracker
+from trackers import PlayerTracker, BallTracker, interpolate_bboxes
+from trackers.ball_tracker import ball_positions_to_array, ball_array_to_positions
+from utils import video_extension, get_video_info
+from pipeline import (detect_video, render_video, keypoints_for_frame, get_model_registry, get_detection_settings,
+                      AnalysisScheduler, AnalysisCancelled, QueueFullError, JobStore, AnalysisCache,
+                      DetectionCheckpoint, detect_video_sharded, PipelineMetrics, aggregate_metrics)
+from knowledge import (KnowledgeBase, EmbeddingIndex, pack_context, hybrid_search, ResponseCache, MemoryCacheBackend,
+                       SQLiteCacheBackend, response_cache_key, history_fingerprint)
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # 200MB limit
 CORS(app)
 
-# Initialize OpenAI client with error handling
-try:
-    client = OpenAI(
-        api_key=os.getenv('OPENAI_API_KEY')
-    )
-    print("✅ OpenAI client initialized successfully")
-except Exception as e:
-    print(f"⚠️ OpenAI client initialization failed: {e}")
-    print("🚀 Server will start without OpenAI client (video upload will still work)")
-    client = None
+# Segment processes started by detect_video_sharded re-import this module as __mp_main__.
+# They only need the module's functions and settings, so none of the services below
+# (OpenAI client, knowledge base, job store, caches, scheduler) are started in them.
+IS_SEGMENT_PROCESS = __name__ == '__mp_main__'
 
 YOUTUBE_ID_RX = re.compile(r"(?:youtu\.be/|youtube\.com/(?:watch\?v=|embed/|shorts/))([A-Za-z0-9_-]{6,})")
 
@@ -59,110 +57,16 @@ def format_video_recommendations(videos):
         lines.append(f"{i}. 📹 **{title}** - [Watch Here]({link})")
     return "\n\n".join(lines)
 
-def load_knowledge_base() -> Dict[str, Any]:
-    """Load all knowledge base files into memory"""
-    knowledge_base = {}
-    kb_directory = "knowledge_base"
-    
-    if not os.path.exists(kb_directory):
-        return knowledge_base
-    
-    for filename in os.listdir(kb_directory):
-        if filename.endswith('.json'):
-            filepath = os.path.join(kb_directory, filename)
-            try:
-                with open(filepath, 'r') as f:
-                    category = filename.replace('.json', '')
-                    knowledge_base[category] = json.load(f)
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
-    
-    return knowledge_base
+def get_relevant_knowledge(query: str, knowledge_base: KnowledgeBase) -> tuple[str, list, list]:
+    """Search knowledge base for relevant information based on query; also returns the chunk IDs used"""
+    # Best-matching chunks of the topic files and resources, packed up to the token budget
+    ranked_chunks = hybrid_search(knowledge_base, embedding_index, query, kind='chunk', limit=KNOWLEDGE_MAX_CHUNKS,
+                                  semantic_weight=SEMANTIC_WEIGHT)
+    relevant_info, chunk_ids = pack_context(ranked_chunks, KNOWLEDGE_TOKEN_BUDGET)
 
-def get_relevant_knowledge(query: str, knowledge_base: Dict[str, Any]) -> tuple[str, list]:
-    """Search knowledge base for relevant information based on query"""
-    query_lower = query.lower()
-    relevant_info = []
-    
-    # Search for specific terms including videos
-    search_terms = {
-        'forehand': ['strokes', 'videos'],
-        'backhand': ['strokes', 'videos'], 
-        'serve': ['strokes', 'videos'],
-        'volley': ['strokes', 'videos'],
-        'strategy': ['strategy', 'videos'],
-        'fitness': ['fitness', 'videos'],
-        'equipment': ['equipment'],
-        'racquet': ['equipment'],
-        'string': ['equipment'],
-        'grip': ['strokes', 'equipment'],
-        'rules': ['resources'],
-        'drill': ['resources', 'videos'],
-        'drills': ['resources', 'videos'],
-        'coaching': ['resources', 'videos'],
-        'practice': ['resources', 'videos'],
-        'biomechanics': ['resources', 'videos'],
-        'injury': ['resources'],
-        'conditioning': ['resources', 'videos'],
-        'tactics': ['resources', 'videos'],
-        'doubles': ['strategy', 'resources', 'videos'],
-        'tournament': ['resources'],
-        'scoring': ['resources'],
-        'tiebreaker': ['resources'],
-        'footwork': ['videos'],
-        'movement': ['videos'],
-        'video': ['videos'],
-        'videos': ['videos']
-    }
-    
-    # First check traditional knowledge base files
-    for term, categories in search_terms.items():
-        if term in query_lower:
-            for cat in categories:
-                if cat in knowledge_base and cat not in ['resources', 'videos']:
-                    relevant_info.append(f"\n--- {cat.upper()} KNOWLEDGE ---")
-                    relevant_info.append(json.dumps(knowledge_base[cat], indent=2))
-                    break
-    
-    # Check for relevant videos
-    video_recommendations = []
-    if 'videos' in knowledge_base:
-        videos_data = knowledge_base['videos']
-        # Handle case where videos is a list (flat structure)
-        if isinstance(videos_data, list):
-            for term, categories in search_terms.items():
-                if term in query_lower and 'videos' in categories:
-                    for video in videos_data:
-                        video_title = video.get('title', '').lower()
-                        video_category = video.get('category', '').lower()
-                        if (term in video_title or term in video_category or 
-                            (term == 'drill' and 'drill' in video_title) or
-                            (term == 'serve' and 'serve' in video_title) or
-                            (term == 'forehand' and 'forehand' in video_title) or
-                            (term == 'backhand' and 'backhand' in video_title) or
-                            (term == 'volley' and ('volley' in video_title or 'net' in video_category))):
-                            video_recommendations.append(video)
-                    
-                    # Limit to 3 video recommendations
-                    if video_recommendations:
-                        break
-    
-    # Then check enhanced resources with extracted content
-    if 'resources' in knowledge_base and 'tennis_resources' in knowledge_base['resources']:
-        for resource in knowledge_base['resources']['tennis_resources']:
-            if resource.get('extracted_content'):
-                # Check if query terms match resource content
-                resource_content = (resource.get('Title', '') + ' ' + 
-                                  resource.get('Key_Topics', '') + ' ' +
-                                  resource.get('extracted_content', '')).lower()
-                
-                # Check for query term matches
-                if any(term in resource_content for term in query_lower.split()):
-                    relevant_info.append(f"\n--- {resource['Title'].upper()} ---")
-                    relevant_info.append(resource['extracted_content'])
-                    break  # Only include one resource to manage token limits
-    
-    return '\n'.join(relevant_info[:3000]), video_recommendations[:3]  # Return videos separately
+    videos = hybrid_search(knowledge_base, embedding_index, query, kind='video', limit=3, semantic_weight=SEMANTIC_WEIGHT)
+    video_recommendations = [document['payload'] for document, _ in videos]
+    return relevant_info, video_recommendations, chunk_ids  # Return videos separately
 
 def extract_web_content(url: str, title: str) -> str:
     """Extract content from web URL using simple HTTP request and OpenAI processing"""
@@ -270,16 +174,26 @@ def enhance_knowledge_base_with_web_content():
     print("Enhanced knowledge base saved to resources_enhanced.json")
     return enhanced_data
 
-# Load knowledge base at startup
-knowledge_base = load_knowledge_base()
+KNOWLEDGE_BASE_DIR = os.getenv('KNOWLEDGE_BASE_DIR', 'knowledge_base')
+# How often searches re-check the knowledge-base files for changes
+KNOWLEDGE_REFRESH_SECONDS = float(os.getenv('KNOWLEDGE_REFRESH_SECONDS', 5))
+# Size the knowledge base is split into, and how much of it goes into each chat request
+KNOWLEDGE_CHUNK_TOKENS = int(os.getenv('KNOWLEDGE_CHUNK_TOKENS', 200))
+KNOWLEDGE_TOKEN_BUDGET = int(os.getenv('KNOWLEDGE_TOKEN_BUDGET', 1000))
+KNOWLEDGE_MAX_CHUNKS = int(os.getenv('KNOWLEDGE_MAX_CHUNKS', 20))
 
-# Try to load enhanced resources if available
-if os.path.exists('knowledge_base/resources_enhanced.json'):
-    with open('knowledge_base/resources_enhanced.json', 'r') as f:
-        enhanced_resources = json.load(f)
-        knowledge_base['resources'] = enhanced_resources
-else:
-    print("No enhanced resources found. Run enhance_knowledge_base_with_web_content() to create them.")
+# Semantic search: 'lsa' (built from the knowledge base, numpy only) or a local sentence-transformers
+# model directory; rebuild with `python -m knowledge.build_index`. SEMANTIC_WEIGHT=0 turns it off.
+EMBEDDING_INDEX_DIR = os.getenv('EMBEDDING_INDEX_DIR', 'cache/embeddings')
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'lsa')
+SEMANTIC_WEIGHT = float(os.getenv('SEMANTIC_WEIGHT', 0.5))
+
+# Answers to repeated questions: 'memory' (per process), 'sqlite' (shared by workers on this host) or 'off'
+CHAT_MODEL = 'gpt-3.5-turbo-0125'
+CHAT_CACHE_BACKEND = os.getenv('CHAT_CACHE_BACKEND', 'memory')
+CHAT_CACHE_TTL_SECONDS = int(os.getenv('CHAT_CACHE_TTL_SECONDS', 24 * 3600))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', 1000))
+CHAT_CACHE_PATH = os.getenv('CHAT_CACHE_PATH', 'cache/chat_responses.db')
 
 def get_conversation_history():
     """Get conversation history for current session"""
@@ -338,7 +252,8 @@ def chat():
         conversation_history = get_conversation_history()
         
         # Get relevant knowledge and videos for this query
-        relevant_knowledge, recommended_videos = get_relevant_knowledge(user_message, knowledge_base)
+        relevant_knowledge, recommended_videos, chunk_ids = get_relevant_knowledge(user_message, knowledge_base)
+        cache_key = response_cache_key(user_message, chunk_ids, history_fingerprint(conversation_history), CHAT_MODEL)
         
         # Add user message
         conversation_history.append({"role": "user", "content": user_message})
@@ -353,12 +268,18 @@ def chat():
         else:
             messages_with_knowledge = conversation_history
         
-        response = client.chat.completions.create(
-            model='gpt-3.5-turbo-0125',
-            messages=messages_with_knowledge
-        )
+        cached = response_cache.get(cache_key) if response_cache else None
+        if cached is not None:
+            assistant_message = cached['response']
+        else:
+            response = client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages_with_knowledge
+            )
+            assistant_message = response.choices[0].message.content.strip()
+            if response_cache:
+                response_cache.set(cache_key, {'response': assistant_message})
         
-        assistant_message = response.choices[0].message.content.strip()
         conversation_history.append({"role": "assistant", "content": assistant_message})
         
         # Update session
@@ -367,6 +288,7 @@ def chat():
         return jsonify({
             'response': assistant_message,
             'videos': recommended_videos,
+            'cached': cached is not None,
             'success': True
         })
         
@@ -386,6 +308,7 @@ def enhance_kb():
     """Endpoint to trigger knowledge base enhancement"""
     try:
         result = enhance_knowledge_base_with_web_content()
+        knowledge_base.refresh(force=True)
         return jsonify({
             'success': True, 
             'message': 'Knowledge base enhancement completed',
@@ -395,64 +318,158 @@ def enhance_kb():
         return jsonify({'success': False, 'error': str(e)})
 
 # Video analysis storage
-video_analysis_results = {}
 UPLOAD_FOLDER = 'uploads'
 RESULTS_FOLDER = 'results'
+CHECKPOINT_FOLDER = os.getenv('CHECKPOINT_FOLDER', os.path.join(RESULTS_FOLDER, 'checkpoints'))
+# Job status lives in SQLite so it survives restarts and is shared by every worker process
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', os.path.join(RESULTS_FOLDER, 'jobs.db'))
+# Detections and rendered videos keyed on video content + model weights, LRU-evicted by size
+ANALYSIS_CACHE_DIR = os.getenv('ANALYSIS_CACHE_DIR', 'cache/analysis')
+ANALYSIS_CACHE_MAX_MB = int(os.getenv('ANALYSIS_CACHE_MAX_MB', 2048))
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv'}
+DETECTION_BATCH_SIZE = int(os.getenv('DETECTION_BATCH_SIZE', 8))
+# Longest run of missed ball detections to interpolate across (0 = no limit)
+BALL_MAX_GAP_FRAMES = int(os.getenv('BALL_MAX_GAP_FRAMES', 0)) or None
+# Track court keypoints through camera pans/cuts instead of reusing the first frame's prediction
+COURT_TRACKING = os.getenv('COURT_TRACKING', 'false').lower() == 'true'
+# Quality vs throughput: 'quality' (every full frame), 'balanced' or 'fast'; see pipeline.DETECTION_PRESETS
+DETECTION_PRESET = os.getenv('DETECTION_PRESET', 'quality')
+# Overlays drawn on the processed video: any of players, ball, court, frame_number
+ANNOTATION_LAYERS = [layer.strip() for layer in os.getenv('ANNOTATION_LAYERS', 'players,ball,court').split(',') if layer.strip()]
+# 'auto' writes H.264 .mp4 through ffmpeg when available, else the original MJPG .avi
+VIDEO_CODEC = os.getenv('VIDEO_CODEC', 'auto')
+# Detections are checkpointed every this many frames so a crashed job resumes mid-video (0 = off)
+CHECKPOINT_CHUNK_FRAMES = int(os.getenv('CHECKPOINT_CHUNK_FRAMES', 600))
+# Long videos are split into time segments detected by this many processes at once (1 = off).
+# Each process loads its own copy of the models, so size this to cores and memory.
+# Sharded detection isn't checkpointed: a crash restarts those videos from the first frame.
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', 1))
+SHARD_MIN_SEGMENT_FRAMES = int(os.getenv('SHARD_MIN_SEGMENT_FRAMES', 9000))
+# Per server process: with several gunicorn workers each one runs ANALYSIS_WORKERS jobs and
+# refuses uploads (429) once its own queue holds ANALYSIS_QUEUE_SIZE
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', 1))
+ANALYSIS_QUEUE_SIZE = int(os.getenv('ANALYSIS_QUEUE_SIZE', 8))
+
+# Optionally load and warm up the models in the background so the first upload doesn't pay for it
+PRELOAD_MODELS = os.getenv('PRELOAD_MODELS', 'false').lower() == 'true'
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def analyze_tennis_video(video_path, video_id):
-    """Analyze tennis video using YOLO models"""
+def frame_progress(video_id, metrics, start, end, total_frames):
+    """progress(frames_done) callback mapping one pass over the video onto start..end percent.
+
+    The job row is only written when the percentage changes, together with the stage metrics.
+    """
+    last_progress = [None]
+    def report(frames_done):
+        fraction = min(1.0, frames_done / total_frames) if total_frames else 0.0
+        progress = start + int((end - start) * fraction)
+        if progress != last_progress[0]:
+            last_progress[0] = progress
+            job_store.update(video_id, progress=progress, metrics=metrics.summary())
+    return report
+
+def analyze_tennis_video(video_id, video_path, detection_preset=DETECTION_PRESET):
+    """Analyze tennis video using YOLO models (runs on an AnalysisScheduler worker)"""
+    should_stop = lambda: analysis_scheduler.is_cancelled(video_id) or job_store.is_cancel_requested(video_id)
+    # Survives a worker crash; resume_orphaned_jobs() reruns the job and detection picks up from here
+    checkpoint = None
+    if CHECKPOINT_CHUNK_FRAMES > 0:
+        checkpoint = DetectionCheckpoint(os.path.join(CHECKPOINT_FOLDER, video_id), app.secret_key, CHECKPOINT_CHUNK_FRAMES)
     try:
         print(f"Starting analysis for video: {video_id}")
         
         # Update status
-        video_analysis_results[video_id]['status'] = 'analyzing'
-        video_analysis_results[video_id]['progress'] = 20
-        
-        # Read video frames
-        videoframes = read_video(video_path)
-        print(f"Read {len(videoframes)} frames from video")
-        video_analysis_results[video_id]['progress'] = 40
-        
-        # Initialize trackers
-        player_tracker = PlayerTracker(model_path="yolov8x")
-        ball_tracker = BallTracker(model_path="models/last.pt")
-        court_line_detector = CourtLineDetector('training/keypoints_model.pth')
-        
-        video_analysis_results[video_id]['progress'] = 50
-        
-        # Detect players and balls
-        print("Detecting players...")
-        player_detections = player_tracker.detect_frames(videoframes, read_from_stub=False)
-        print("Detecting balls...")
-        ball_detections = ball_tracker.detect_frames(videoframes, read_from_stub=False)
-        ball_detections = ball_tracker.interpolate_ball_positions(ball_detections)
-        
-        video_analysis_results[video_id]['progress'] = 70
-        
-        # Detect court lines on first frame
-        print("Detecting court lines...")
-        court_keypoints = court_line_detector.predict(videoframes[0])
-        
-        # Filter players based on court position
-        print("Filtering players...")
-        player_detections = player_tracker.choose_and_filter_players(court_keypoints, player_detections)
-        
-        video_analysis_results[video_id]['progress'] = 85
-        
-        # Generate output video with annotations
-        print("Drawing annotations...")
-        output_video_frames = player_tracker.draw_bboxes(videoframes, player_detections)
-        output_video_frames = ball_tracker.draw_bboxes(output_video_frames, ball_detections)
-        output_video_frames = court_line_detector.draw_keypoints_on_video(output_video_frames, court_keypoints)
-        
-        # Save processed video
-        output_path = f"{RESULTS_FOLDER}/{video_id}_processed.avi"
-        print(f"Saving processed video to: {output_path}")
-        save_video(output_video_frames, output_path)
+        metrics = PipelineMetrics()
+        job_store.update(video_id, status='analyzing', progress=0, metrics=metrics.summary())
+        total_frames = get_video_info(video_path)['frame_count']
+        
+        model_registry = get_model_registry()
+        output_filename = f"{video_id}_processed{video_extension(VIDEO_CODEC)}"
+        output_path = f"{RESULTS_FOLDER}/{output_filename}"
+        detection_settings = get_detection_settings(detection_preset)
+        
+        # Identical clip analysed with identical models: reuse the stored detections and video
+        cache_key = analysis_cache.key_for(video_path, model_registry.fingerprint(
+            ball_max_gap=BALL_MAX_GAP_FRAMES, court_tracking=COURT_TRACKING,
+            video_format=video_extension(VIDEO_CODEC), detection=detection_settings.as_dict(),
+            layers=ANNOTATION_LAYERS
+        ))
+        cached = analysis_cache.get(cache_key)
+        # The detect/render passes poll should_stop themselves; the cache-hit path has to check here
+        if should_stop():
+            raise AnalysisCancelled()
+        if cached is not None and analysis_cache.copy_video(cache_key, output_path):
+            print(f"Reusing cached analysis for video: {video_id}")
+            player_detections = cached['player_detections']
+            ball_detections = cached['ball_detections']
+            court_keypoints = cached['court_keypoints']
+        else:
+            job_store.update(video_id, progress=5)
+            
+            # Stream frames through both detectors; only the detections are kept in memory.
+            # Progress runs 5-70% with the frames detected
+            print("Detecting players, balls and court lines...")
+            if SHARD_WORKERS > 1 and total_frames >= 2 * SHARD_MIN_SEGMENT_FRAMES:
+                # Segments run in parallel processes and their tracks are stitched back together.
+                # Their stage timings are summed into metrics; sharded_detect is the wall time.
+                # Only the segment processes load the models; this one filters and draws without weights
+                player_tracker, ball_tracker, court_line_detector = PlayerTracker(), BallTracker(), CourtLineDetector()
+                if checkpoint is not None:
+                    print(f"Sharded detection of {video_id} is not checkpointed; a crash restarts it from frame 0")
+                with metrics.stage('sharded_detect', total_frames):
+                    player_detections, ball_detections, court_keypoints = detect_video_sharded(
+                        video_path, SHARD_WORKERS, model_registry.model_paths(), settings=detection_settings,
+                        batch_size=DETECTION_BATCH_SIZE, track_court=COURT_TRACKING, should_stop=should_stop,
+                        min_segment_frames=SHARD_MIN_SEGMENT_FRAMES, metrics=metrics,
+                        progress=frame_progress(video_id, metrics, 5, 70, total_frames)
+                    )
+                # Ball gaps can span segment boundaries, so interpolate once the tracks are stitched
+                with metrics.stage('interpolate', len(ball_detections)):
+                    ball_detections = ball_array_to_positions(
+                        interpolate_bboxes(ball_positions_to_array(ball_detections), BALL_MAX_GAP_FRAMES)
+                    )
+            else:
+                # Trackers share weights loaded once per process; only the track state is per job
+                player_tracker = model_registry.player_tracker()
+                ball_tracker = model_registry.ball_tracker(search_window=detection_settings.ball_search_window)
+                court_line_detector = model_registry.court_line_detector()
+                court_tracker = CourtKeypointTracker(court_line_detector) if COURT_TRACKING else None
+                player_detections, ball_detections, court_keypoints = detect_video(
+                    video_path, player_tracker, ball_tracker, court_line_detector,
+                    batch_size=DETECTION_BATCH_SIZE, should_stop=should_stop, court_tracker=court_tracker,
+                    settings=detection_settings, checkpoint=checkpoint, metrics=metrics,
+                    progress=frame_progress(video_id, metrics, 5, 70, total_frames),
+                    interpolate_balls=True, ball_max_gap=BALL_MAX_GAP_FRAMES
+                )
+            print(f"Processed {len(player_detections)} frames from video")
+            
+            job_store.update(video_id, progress=70, metrics=metrics.summary())
+            
+            # Filter players based on court position
+            print("Filtering players...")
+            with metrics.stage('filter', len(player_detections)):
+                player_detections = player_tracker.choose_and_filter_players(
+                    keypoints_for_frame(court_keypoints, 0), player_detections
+                )
+            
+            job_store.update(video_id, progress=75, metrics=metrics.summary())
+            
+            # Re-decode the video, annotate each frame and encode it straight away (progress 75-95%)
+            print(f"Drawing annotations and saving processed video to: {output_path}")
+            render_video(
+                video_path, output_path, player_detections, ball_detections, court_keypoints,
+                player_tracker, ball_tracker, court_line_detector, should_stop=should_stop,
+                codec=VIDEO_CODEC, layers=ANNOTATION_LAYERS, metrics=metrics,
+                progress=frame_progress(video_id, metrics, 75, 95, total_frames)
+            )
+            
+            analysis_cache.put(cache_key, {
+                'player_detections': player_detections,
+                'ball_detections': ball_detections,
+                'court_keypoints': court_keypoints
+            }, video_path=output_path)
         
         # Generate analysis results
         player_count = sum(len(frame_detections) for frame_detections in player_detections)
@@ -461,35 +478,44 @@ def analyze_tennis_video(video_path, video_id):
         analysis_data = {
             'player_positions': player_count,
             'ball_detections': ball_count,
-            'court_keypoints': len(court_keypoints) // 2,  # keypoints come in pairs (x,y)
-            'total_frames': len(videoframes),
+            'court_keypoints': len(keypoints_for_frame(court_keypoints, 0)) // 2,  # keypoints come in pairs (x,y)
+            'total_frames': len(player_detections),
             'processed_video_path': output_path
         }
         
         print(f"Analysis complete: {analysis_data}")
+        print(f"Stage metrics: {metrics.summary()['stages']}")
+        job_store.update(video_id, progress=95, metrics=metrics.summary())
+        if should_stop():
+            raise AnalysisCancelled()
         
         # Generate AI coaching feedback
-        coaching_feedback = generate_tennis_coaching_feedback(analysis_data)
+        with metrics.stage('coaching_feedback'):
+            coaching_feedback = generate_tennis_coaching_feedback(analysis_data)
         
         # Update final results
-        video_analysis_results[video_id].update({
-            'status': 'completed',
-            'progress': 100,
-            'analysis': analysis_data,
-            'coaching_feedback': coaching_feedback,
-            'processed_video_url': f'/results/{video_id}_processed.avi'
-        })
+        job_store.update(video_id, metrics=metrics.summary())
+        job_store.complete(
+            video_id,
+            analysis=analysis_data,
+            coaching_feedback=coaching_feedback,
+            processed_video_url=f'/results/{output_filename}'
+        )
         
         print(f"Analysis completed for video: {video_id}")
         
+    except AnalysisCancelled:
+        print(f"Analysis cancelled for video: {video_id}")
+        job_store.update(video_id, status='cancelled')
     except Exception as e:
         print(f"Error analyzing video {video_id}: {str(e)}")
         import traceback
         traceback.print_exc()
-        video_analysis_results[video_id].update({
-            'status': 'error',
-            'error': str(e)
-        })
+        job_store.update(video_id, status='error', error=str(e))
+    finally:
+        # Only a crashed process leaves its checkpoint behind for the resumed job
+        if checkpoint is not None:
+            checkpoint.clear()
 
 def generate_tennis_coaching_feedback(analysis_data):
     """Generate AI coaching feedback from video analysis"""
@@ -547,6 +573,78 @@ def generate_tennis_coaching_feedback(analysis_data):
     except Exception as e:
         return f"Error generating coaching feedback: {str(e)}"
 
+def resume_orphaned_jobs():
+    """Re-queue jobs left queued or half-analyzed by a worker that crashed or was restarted"""
+    for video_id, upload_path in job_store.claim_orphaned_jobs():
+        try:
+            analysis_scheduler.submit(video_id, upload_path)
+            print(f"Resumed analysis for video: {video_id}")
+        except QueueFullError:
+            job_store.update(video_id, status='error', error='Analysis was interrupted by a server restart')
+
+# Everything below starts threads, opens files or talks to other services; see IS_SEGMENT_PROCESS
+if not IS_SEGMENT_PROCESS:
+    # Initialize OpenAI client with error handling
+    try:
+        client = OpenAI(
+            api_key=os.getenv('OPENAI_API_KEY')
+        )
+        print("✅ OpenAI client initialized successfully")
+    except Exception as e:
+        print(f"⚠️ OpenAI client initialization failed: {e}")
+        print("🚀 Server will start without OpenAI client (video upload will still work)")
+        client = None
+
+    # Load and index the knowledge base at startup; edited files are re-indexed on the fly
+    knowledge_base = KnowledgeBase(KNOWLEDGE_BASE_DIR, refresh_interval=KNOWLEDGE_REFRESH_SECONDS,
+                                   chunk_tokens=KNOWLEDGE_CHUNK_TOKENS)
+
+    embedding_index = EmbeddingIndex(EMBEDDING_INDEX_DIR)
+    if SEMANTIC_WEIGHT > 0:
+        embedding_index.load()
+        if embedding_index.model == EMBEDDING_MODEL and not embedding_index.is_stale(knowledge_base):
+            print(f"Loaded embedding index from {EMBEDDING_INDEX_DIR}")
+        elif EMBEDDING_MODEL == 'lsa':
+            # Fitting LSA on the knowledge base takes well under a second, so just rebuild
+            embedding_index = EmbeddingIndex.build(knowledge_base, EMBEDDING_INDEX_DIR)
+        elif embedding_index.loaded:
+            print("Embedding index is out of date with the knowledge base or EMBEDDING_MODEL; "
+                  "run `python -m knowledge.build_index`")
+        else:
+            print("No embedding index found; run `python -m knowledge.build_index` for semantic search")
+
+    if CHAT_CACHE_BACKEND == 'sqlite':
+        response_cache = ResponseCache(SQLiteCacheBackend(CHAT_CACHE_PATH, max_entries=CHAT_CACHE_MAX_ENTRIES),
+                                       CHAT_CACHE_TTL_SECONDS)
+    elif CHAT_CACHE_BACKEND == 'memory':
+        response_cache = ResponseCache(MemoryCacheBackend(max_entries=CHAT_CACHE_MAX_ENTRIES), CHAT_CACHE_TTL_SECONDS)
+    else:
+        response_cache = None
+
+    if not os.path.exists(os.path.join(KNOWLEDGE_BASE_DIR, 'resources_enhanced.json')):
+        print("No enhanced resources found. Run enhance_knowledge_base_with_web_content() to create them.")
+
+    job_store = JobStore(JOB_STORE_PATH)
+    analysis_cache = AnalysisCache(ANALYSIS_CACHE_DIR, max_bytes=ANALYSIS_CACHE_MAX_MB * 1024 * 1024)
+    if CHECKPOINT_CHUNK_FRAMES > 0 and not os.getenv('SECRET_KEY'):
+        print("⚠️ SECRET_KEY is not set; detection checkpoints are signed with the development key")
+    if SHARD_WORKERS > 1 and CHECKPOINT_CHUNK_FRAMES > 0:
+        print(f"⚠️ Detection checkpoints only cover single-process detection; videos of "
+              f"{2 * SHARD_MIN_SEGMENT_FRAMES}+ frames are sharded and restart from scratch after a crash")
+    if PRELOAD_MODELS:
+        threading.Thread(target=get_model_registry().warm_up, daemon=True).start()
+
+    # Fixed worker pool with a bounded queue instead of one thread (and one model copy) per upload
+    analysis_scheduler = AnalysisScheduler(
+        analyze_tennis_video,
+        num_workers=ANALYSIS_WORKERS,
+        max_queue_size=ANALYSIS_QUEUE_SIZE
+    )
+
+    # Skip the debug reloader's parent process; only the process actually serving requests resumes jobs
+    if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        resume_orphaned_jobs()
+
 @app.route('/upload-video', methods=['POST'])
 def upload_video():
     """Upload and analyze tennis video"""
@@ -561,6 +659,10 @@ def upload_video():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'error': 'Invalid file type. Please upload MP4, AVI, MOV, or MKV files.'}), 400
         
+        # Refuse early rather than saving a file we have no capacity to analyze
+        if analysis_scheduler.is_full():
+            return jsonify({'success': False, 'error': 'Analysis queue is full. Please try again in a few minutes.'}), 429
+        
         # Generate unique video ID
         video_id = str(uuid.uuid4())
         filename = secure_filename(f"{video_id}_{file.filename}")
@@ -574,26 +676,22 @@ def upload_video():
         file.save(file_path)
         
         # Initialize analysis status
-        video_analysis_results[video_id] = {
-            'status': 'uploaded',
-            'progress': 0,
-            'filename': filename,
-            'upload_path': file_path
-        }
+        job_store.create(video_id, status='queued', progress=0, filename=filename, upload_path=file_path)
         
-        # Start analysis in background thread
-        analysis_thread = threading.Thread(
-            target=analyze_tennis_video, 
-            args=(file_path, video_id)
-        )
-        analysis_thread.daemon = True
-        analysis_thread.start()
+        # Hand the job to the worker pool
+        try:
+            analysis_scheduler.submit(video_id, file_path)
+        except QueueFullError as e:
+            job_store.delete(video_id)
+            os.remove(file_path)
+            return jsonify({'success': False, 'error': str(e)}), 429
         
         return jsonify({
             'success': True,
             'video_id': video_id,
-            'message': 'Video uploaded successfully. Analysis started.',
-            'status': 'processing'
+            'message': 'Video uploaded successfully. Analysis queued.',
+            'status': 'queued',
+            'queue_position': job_store.queue_position(video_id)
         })
         
     except Exception as e:
@@ -603,16 +701,49 @@ def upload_video():
 @app.route('/video-analysis/<video_id>', methods=['GET'])
 def get_video_analysis(video_id):
     """Get video analysis status and results"""
-    if video_id not in video_analysis_results:
+    result = job_store.get(video_id)
+    if result is None:
         return jsonify({'success': False, 'error': 'Video not found'}), 404
     
-    result = video_analysis_results[video_id]
+    if result['status'] == 'queued':
+        # Counted in the shared job store, so polls answered by any worker process agree
+        result = {**result, 'queue_position': job_store.queue_position(video_id)}
     return jsonify({
         'success': True,
         'video_id': video_id,
         **result
     })
 
+@app.route('/video-analysis/<video_id>/cancel', methods=['POST'])
+def cancel_video_analysis(video_id):
+    """Cancel a queued or running analysis"""
+    job = job_store.get(video_id, include_result=False)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Video not found'}), 404
+    
+    outcome = analysis_scheduler.cancel(video_id)
+    if outcome == 'dequeued':
+        job_store.update(video_id, status='cancelled')
+    elif outcome is None and not job_store.request_cancel(video_id):
+        # Jobs owned by another worker process are cancelled through the store flag
+        return jsonify({'success': False, 'error': 'Analysis is not queued or running'}), 409
+    
+    job = job_store.get(video_id, include_result=False)
+    return jsonify({'success': True, 'video_id': video_id, 'status': job['status']})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage timings over recently completed analyses, plus queue, cache, knowledge-base and chat cache state"""
+    return jsonify({
+        'success': True,
+        'analysis': aggregate_metrics(job_store.recent_metrics()),
+        'scheduler': analysis_scheduler.stats(),
+        'cache': analysis_cache.stats(),
+        'knowledge_base': knowledge_base.stats(),
+        'embedding_index': embedding_index.stats(),
+        'chat_cache': response_cache.stats() if response_cache else None
+    })
+
 @app.route('/results/<filename>')
 def serve_result_video(filename):
     """Serve processed video files"""
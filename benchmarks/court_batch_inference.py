@@ -0,0 +1,55 @@
+"""Compare CourtLineDetector.predict (per frame, PIL preprocessing) with predict_batch.
+
+Usage: python benchmarks/court_batch_inference.py training/keypoints_model.pth --video testingvideos/input_video.mp4 --batch-size 16
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils import iter_video_frames
+from court_detector import CourtLineDetector
+
+def load_frames(video_path, num_frames, width, height):
+    if video_path is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(num_frames)]
+    frames = []
+    for frame in iter_video_frames(video_path):
+        frames.append(frame)
+        if len(frames) >= num_frames:
+            break
+    return frames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('model_path')
+    parser.add_argument('--video', help='clip to read frames from (random frames if omitted)')
+    parser.add_argument('--frames', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    args = parser.parse_args()
+
+    detector = CourtLineDetector(args.model_path)
+    frames = load_frames(args.video, args.frames, args.width, args.height)
+    detector.predict(frames[0])
+    detector.predict_batch(frames[:2])  # warm-up
+
+    start = time.perf_counter()
+    reference = np.array([detector.predict(frame) for frame in frames])
+    per_frame = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = np.concatenate([detector.predict_batch(frames[i:i + args.batch_size])
+                              for i in range(0, len(frames), args.batch_size)])
+    batch_time = time.perf_counter() - start
+
+    print(f"predict        {1000 * per_frame / len(frames):7.2f} ms/frame")
+    print(f"predict_batch  {1000 * batch_time / len(frames):7.2f} ms/frame  x{per_frame / batch_time:.2f}")
+    print(f"max keypoint difference: {np.abs(reference - batched).max():.3f} px")
+
+if __name__ == "__main__":
+    main()
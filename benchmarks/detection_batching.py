@@ -0,0 +1,71 @@
+"""Compare per-frame and batched YOLO inference throughput.
+
+Usage: python benchmarks/detection_batching.py testingvideos/input_video.mp4 --frames 240 --batch-sizes 4 8 16
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils import iter_video_frames
+from trackers import PlayerTracker, BallTracker
+
+def load_frames(video_path, max_frames):
+    frames = []
+    for frame in iter_video_frames(video_path):
+        frames.append(frame)
+        if len(frames) >= max_frames:
+            break
+    return frames
+
+def time_detection(make_tracker, frames, batch_size):
+    # A fresh tracker per run so player track IDs start from the same state
+    tracker = make_tracker()
+    tracker.detect_frame(frames[0])  # warm-up
+    tracker = make_tracker()
+    start = time.perf_counter()
+    detections = tracker.detect_frames(frames, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return detections, len(frames) / elapsed
+
+def same_detections(detections, baseline, atol=1.0):
+    """Same frames, track IDs and boxes, within atol pixels (batched kernels aren't bit-identical)"""
+    if len(detections) != len(baseline):
+        return False
+    for frame_dict, baseline_dict in zip(detections, baseline):
+        if frame_dict.keys() != baseline_dict.keys():
+            return False
+        for track_id, bbox in frame_dict.items():
+            if not np.allclose(bbox, baseline_dict[track_id], atol=atol):
+                return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('video')
+    parser.add_argument('--frames', type=int, default=240)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--player-model', default='yolov8x')
+    parser.add_argument('--ball-model', default='models/last.pt')
+    parser.add_argument('--atol', type=float, default=1.0, help='allowed bbox difference in pixels')
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    trackers = {
+        'player': lambda: PlayerTracker(model_path=args.player_model),
+        'ball': lambda: BallTracker(model_path=args.ball_model),
+    }
+
+    for name, make_tracker in trackers.items():
+        baseline, baseline_fps = time_detection(make_tracker, frames, batch_size=1)
+        print(f"{name:>6}  batch=1   {baseline_fps:7.2f} frames/s")
+        for batch_size in args.batch_sizes:
+            detections, fps = time_detection(make_tracker, frames, batch_size)
+            same = same_detections(detections, baseline, args.atol)
+            print(f"{name:>6}  batch={batch_size:<3} {fps:7.2f} frames/s  "
+                  f"x{fps / baseline_fps:.2f}  same_detections={same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Time every stage of the video pipeline on a synthetic clip and check for regressions.
+
+Usage:
+  python benchmarks/pipeline_benchmark.py --frames 300 --width 1280 --height 720 --models stub
+  python benchmarks/pipeline_benchmark.py --save-baseline       # record this machine's numbers
+  python benchmarks/pipeline_benchmark.py --check               # exit 1 on a regression
+
+--models stub finds the synthetic players and ball by colour (no weights, no GPU) so the
+numbers are dominated by the pipeline code itself; --models tiny runs untrained yolov8n
+and the real ResNet50 court architecture for realistic inference cost. Baselines are per
+machine and per scenario (models, resolution, frame count): record one before a change,
+then --check after it.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils import read_video, save_video
+from trackers import PlayerTracker, BallTracker
+from court_detector import CourtLineDetector
+from pipeline import detect_video, render_video, FrameAnnotator
+from pipeline.instrumentation import peak_rss_mb
+from synthetic import SyntheticClip
+from stub_models import stub_player_model, stub_ball_model, StubCourtLineDetector
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+def make_models(kind, clip, work_dir):
+    """Factory for fresh (player_tracker, ball_tracker, court_line_detector) so every run starts untracked"""
+    if kind == 'stub':
+        return lambda: (PlayerTracker(model=stub_player_model()), BallTracker(model=stub_ball_model()),
+                        StubCourtLineDetector(clip.court_keypoints))
+
+    import torch
+    from torchvision import models
+    court_path = os.path.join(work_dir, 'court_untrained.pth')
+    court_model = models.resnet50(weights=None)
+    court_model.fc = torch.nn.Linear(court_model.fc.in_features, 14 * 2)
+    torch.save(court_model.state_dict(), court_path)
+    court_line_detector = CourtLineDetector(court_path, prefer_frozen=False)
+    return lambda: (PlayerTracker(model_path='yolov8n.yaml'), BallTracker(model_path='yolov8n.yaml'),
+                    court_line_detector)
+
+def run_stages(clip_path, output_dir, new_models, stage_hook):
+    """The legacy list-based pipeline, then the streaming one; stage_hook(name, frames) wraps each stage"""
+    player_tracker, ball_tracker, court_line_detector = new_models()
+
+    with stage_hook('read_video', None) as stage:
+        frames = read_video(clip_path)
+        stage['frames'] = len(frames)
+    num_frames = len(frames)
+
+    with stage_hook('player_detect_frames', num_frames):
+        player_detections = player_tracker.detect_frames(frames, batch_size=8)
+    with stage_hook('ball_detect_frames', num_frames):
+        ball_detections = ball_tracker.detect_frames(frames, batch_size=8)
+    with stage_hook('interpolate_ball_positions', num_frames):
+        ball_detections = ball_tracker.interpolate_ball_positions(ball_detections)
+    with stage_hook('court_predict', 1):
+        court_keypoints = court_line_detector.predict(frames[0])
+    with stage_hook('choose_and_filter_players', num_frames):
+        player_detections = player_tracker.choose_and_filter_players(court_keypoints, player_detections)
+
+    annotator = FrameAnnotator(player_tracker, ball_tracker, court_line_detector)
+    with stage_hook('draw', num_frames):
+        for frame_num, frame in enumerate(frames):
+            annotator.annotate(frame, frame_num, player_detections[frame_num], ball_detections[frame_num],
+                               court_keypoints)
+    with stage_hook('save_video', num_frames):
+        save_video(frames, os.path.join(output_dir, 'legacy.avi'), codec='mjpg')
+    del frames
+
+    player_tracker, ball_tracker, court_line_detector = new_models()
+    with stage_hook('stream_detect', num_frames):
+        player_detections, ball_detections, court_keypoints = detect_video(
+            clip_path, player_tracker, ball_tracker, court_line_detector, batch_size=8)
+    with stage_hook('stream_render', num_frames):
+        render_video(clip_path, os.path.join(output_dir, 'stream.avi'), player_detections, ball_detections,
+                     court_keypoints, player_tracker, ball_tracker, court_line_detector, codec='mjpg')
+
+class _Stage:
+    def __init__(self, results, name, frames, trace_memory):
+        self.results = results
+        self.name = name
+        self.info = {'frames': frames}
+        self.trace_memory = trace_memory
+
+    def __enter__(self):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self._traced_before = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+        return self.info
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        entry = self.results.setdefault(self.name, {'frames': self.info['frames']})
+        if self.trace_memory:
+            entry['peak_mb'] = round((tracemalloc.get_traced_memory()[1] - self._traced_before) / 1024 ** 2, 2)
+        else:
+            entry.setdefault('times', []).append(elapsed)
+        return False
+
+def benchmark(clip_path, new_models, repeat):
+    """Best-of-repeat wall time per stage, then one traced run for peak Python/NumPy memory"""
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        # One warm-up run so imports, model builds and caches don't count
+        run_stages(clip_path, output_dir, new_models, lambda name, frames: _Stage({}, name, frames, False))
+        for _ in range(repeat):
+            run_stages(clip_path, output_dir, new_models, lambda name, frames: _Stage(results, name, frames, False))
+        tracemalloc.start()
+        try:
+            run_stages(clip_path, output_dir, new_models, lambda name, frames: _Stage(results, name, frames, True))
+        finally:
+            tracemalloc.stop()
+
+    stages = {}
+    for name, entry in results.items():
+        seconds = min(entry['times'])
+        stages[name] = {
+            'seconds': round(seconds, 4),
+            'fps': round(entry['frames'] / seconds, 1) if seconds > 0 else None,
+            'peak_mb': entry['peak_mb'],
+        }
+    return {'stages': stages, 'peak_rss_mb': peak_rss_mb()}
+
+def compare(current, baseline, fps_tolerance, memory_tolerance):
+    """Human-readable regression messages (empty if none)"""
+    regressions = []
+    for name, base in baseline['stages'].items():
+        stage = current['stages'].get(name)
+        if stage is None:
+            regressions.append(f"{name}: stage missing from this run")
+            continue
+        # Stages under 10 ms are mostly timer and scheduler noise
+        if (base['fps'] and base['seconds'] >= 0.01 and stage['fps'] is not None
+                and stage['fps'] < base['fps'] * (1 - fps_tolerance)):
+            regressions.append(f"{name}: {stage['fps']} fps vs baseline {base['fps']} fps")
+        # Allocations under 1 MB are noise from caches and interpreter internals
+        if stage['peak_mb'] > max(1.0, base['peak_mb'] * (1 + memory_tolerance)):
+            regressions.append(f"{name}: peak {stage['peak_mb']} MB vs baseline {base['peak_mb']} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--models', choices=('stub', 'tiny'), default='stub')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the scenario baseline')
+    parser.add_argument('--check', action='store_true', help='exit 1 if any stage regressed against the baseline')
+    parser.add_argument('--fps-tolerance', type=float, default=0.2, help='allowed fractional fps drop')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='allowed fractional peak memory growth')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    scenario = f"{args.models}-{args.width}x{args.height}-{args.frames}f"
+    clip = SyntheticClip(args.frames, args.width, args.height, args.fps, args.seed)
+    with tempfile.TemporaryDirectory() as work_dir:
+        clip_path = clip.write(os.path.join(work_dir, 'clip.avi'))
+        current = benchmark(clip_path, make_models(args.models, clip, work_dir), args.repeat)
+
+    print(f"scenario {scenario}  (peak RSS {current['peak_rss_mb']} MB)")
+    print(f"{'stage':<28}{'seconds':>10}{'fps':>10}{'peak MB':>10}")
+    for name, stage in current['stages'].items():
+        print(f"{name:<28}{stage['seconds']:>10.4f}{stage['fps'] or 0:>10.1f}{stage['peak_mb']:>10.2f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'scenario': scenario, **current}, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[scenario] = current
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Saved baseline for {scenario} to {args.baseline}")
+        return 0
+
+    if scenario not in baselines:
+        print(f"No baseline for {scenario} in {args.baseline}; run with --save-baseline first")
+        return 1 if args.check else 0
+
+    regressions = compare(current, baselines[scenario], args.fps_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions against the {scenario} baseline")
+    return 1 if regressions and args.check else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Stand-ins for the YOLO and court models that work on synthetic clips.
+
+The stubs find the synthetic players and ball by colour, so the rest of the pipeline
+(tracking dicts, interpolation, filtering, drawing, encoding) runs on realistic
+detections without downloading weights or needing a GPU. Results are real ultralytics
+Results objects, so the trackers' own parsing code is exercised too.
+"""
+import os
+import sys
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from court_detector import CourtLineDetector
+from synthetic import FAR_PLAYER_COLOR, NEAR_PLAYER_COLOR, BALL_COLOR
+
+def _colour_boxes(frame, color, tolerance=40, min_area=4):
+    """Bounding boxes of the blobs in frame within tolerance of a BGR colour"""
+    color = np.array(color, dtype=np.int16)
+    mask = cv2.inRange(frame, np.clip(color - tolerance, 0, 255).astype(np.uint8),
+                       np.clip(color + tolerance, 0, 255).astype(np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    boxes = []
+    for x, y, w, h, area in stats[1:count]:
+        if area >= min_area:
+            boxes.append((float(x), float(y), float(x + w), float(y + h), float(area)))
+    return boxes
+
+class StubYOLO:
+    """Just enough of ultralytics.YOLO for PlayerTracker/BallTracker: track() and predict().
+
+    classes is a list of (class name, colour it is found by); each entry's largest blob is
+    reported, and tracking gives every entry a fixed track ID.
+    """
+
+    def __init__(self, classes):
+        self.classes = classes
+        self.names = {class_id: name for class_id, (name, _) in enumerate(classes)}
+        self.predictor = None
+        self.callbacks = {}
+
+    def _detect(self, frame, with_ids):
+        rows = []
+        for class_id, (_, color) in enumerate(self.classes):
+            boxes = _colour_boxes(frame, color)
+            if not boxes:
+                continue
+            x1, y1, x2, y2, _ = max(boxes, key=lambda box: box[4])
+            track_id = [float(class_id + 1)] if with_ids else []
+            rows.append([x1, y1, x2, y2, *track_id, 0.9, float(class_id)])
+        columns = 7 if with_ids else 6
+        boxes = torch.tensor(rows, dtype=torch.float32).reshape(-1, columns)
+        return Results(frame, path='', names=self.names, boxes=boxes)
+
+    def _run(self, source, with_ids):
+        frames = source if isinstance(source, list) else [source]
+        return [self._detect(frame, with_ids) for frame in frames]
+
+    def track(self, source, **kwargs):
+        return self._run(source, with_ids=True)
+
+    def predict(self, source, **kwargs):
+        return self._run(source, with_ids=False)
+
+    def add_callback(self, event, func):
+        self.callbacks.setdefault(event, []).append(func)
+
+def stub_player_model():
+    # Person class for both players; separate colours give them separate track IDs
+    return StubYOLO([('person', FAR_PLAYER_COLOR), ('person', NEAR_PLAYER_COLOR)])
+
+def stub_ball_model():
+    return StubYOLO([('tennis ball', BALL_COLOR)])
+
+class StubCourtLineDetector(CourtLineDetector):
+    """Returns the clip's true keypoints; the cost of court inference is not modelled"""
+
+    def __init__(self, keypoints):
+        # No model_path: the parent loads no weights but keeps draw_keypoints working
+        super().__init__()
+        self.keypoints = np.asarray(keypoints, dtype=np.float64)
+
+    def predict(self, image):
+        return self.keypoints.copy()
+
+    def predict_batch(self, frames):
+        return np.array([self.predict(frame) for frame in frames])
@@ -0,0 +1,133 @@
+"""Synthetic tennis clips (court, two players, ball) with their ground truth.
+
+Nothing here needs a real match video: a court is drawn in perspective, two coloured
+"players" shuffle along the baselines and a ball flies between them in arcs, hidden for
+a few frames now and then so interpolation has gaps to fill.
+"""
+import os
+import sys
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils import VideoFrameWriter
+
+COURT_WIDTH = 10.97   # doubles, metres
+COURT_LENGTH = 23.77
+SINGLES_INSET = 1.37
+SERVICE_LINE = 6.40   # from the net
+
+# The 14 keypoints in the order the court model predicts them: doubles corners, singles
+# sidelines, service line corners and the two centre service marks
+COURT_POINTS = np.array([
+    (0, 0), (COURT_WIDTH, 0), (0, COURT_LENGTH), (COURT_WIDTH, COURT_LENGTH),
+    (SINGLES_INSET, 0), (SINGLES_INSET, COURT_LENGTH),
+    (COURT_WIDTH - SINGLES_INSET, 0), (COURT_WIDTH - SINGLES_INSET, COURT_LENGTH),
+    (SINGLES_INSET, COURT_LENGTH / 2 - SERVICE_LINE), (COURT_WIDTH - SINGLES_INSET, COURT_LENGTH / 2 - SERVICE_LINE),
+    (SINGLES_INSET, COURT_LENGTH / 2 + SERVICE_LINE), (COURT_WIDTH - SINGLES_INSET, COURT_LENGTH / 2 + SERVICE_LINE),
+    (COURT_WIDTH / 2, COURT_LENGTH / 2 - SERVICE_LINE), (COURT_WIDTH / 2, COURT_LENGTH / 2 + SERVICE_LINE),
+], dtype=np.float32)
+
+COURT_LINES = [(0, 1), (2, 3), (0, 2), (1, 3), (4, 5), (6, 7), (8, 9), (10, 11), (12, 13)]
+
+# BGR colours the stub detectors segment on
+FAR_PLAYER_COLOR = (40, 40, 220)
+NEAR_PLAYER_COLOR = (220, 60, 40)
+BALL_COLOR = (0, 255, 255)
+
+def court_homography(width, height):
+    """Court metres -> pixels for a broadcast-style view from behind the near baseline"""
+    corners = COURT_POINTS[:4]
+    image_corners = np.array([
+        (0.32 * width, 0.22 * height), (0.68 * width, 0.22 * height),
+        (0.12 * width, 0.88 * height), (0.88 * width, 0.88 * height),
+    ], dtype=np.float32)
+    return cv2.getPerspectiveTransform(corners, image_corners)
+
+def _to_image(points, homography):
+    return cv2.perspectiveTransform(np.asarray(points, np.float32).reshape(-1, 1, 2), homography).reshape(-1, 2)
+
+def court_keypoints(width, height):
+    """Ground-truth (28,) keypoints (x0, y0, x1, y1, ...) for a clip of this size"""
+    return _to_image(COURT_POINTS, court_homography(width, height)).reshape(-1).astype(np.float64)
+
+def draw_court(width, height):
+    frame = np.zeros((height, width, 3), np.uint8)
+    frame[:] = (60, 120, 60)
+    homography = court_homography(width, height)
+    surface = _to_image(COURT_POINTS[[0, 1, 3, 2]], homography).astype(np.int32)
+    cv2.fillPoly(frame, [surface], (150, 90, 50))
+    keypoints = _to_image(COURT_POINTS, homography)
+    thickness = max(1, width // 640)
+    for start, end in COURT_LINES:
+        cv2.line(frame, tuple(keypoints[start].astype(int)), tuple(keypoints[end].astype(int)), (255, 255, 255), thickness)
+    return frame
+
+class SyntheticClip:
+    """A clip of num_frames frames plus the boxes that were drawn into each one"""
+
+    def __init__(self, num_frames=300, width=1280, height=720, fps=30, seed=0):
+        self.num_frames = num_frames
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.court_keypoints = court_keypoints(width, height)
+        self._background = draw_court(width, height)
+        self._homography = court_homography(width, height)
+        rng = np.random.default_rng(seed)
+        self._phase = rng.uniform(0, 2 * np.pi, size=2)
+        # Short runs of frames with the ball hidden, as when it passes behind a player
+        hidden = rng.choice(num_frames, size=max(1, num_frames // 60), replace=False)
+        self._hidden_ball = {int(start) + offset for start in hidden for offset in range(3)}
+
+    def _player_box(self, frame_num, far):
+        t = frame_num / self.fps
+        x_court = COURT_WIDTH / 2 + 3.5 * np.sin(0.6 * t + self._phase[int(far)])
+        y_court = -1.0 if far else COURT_LENGTH + 1.0
+        foot_x, foot_y = _to_image([(x_court, y_court)], self._homography)[0]
+        # Players shrink with distance like everything else in the view
+        scale = foot_y / self.height
+        box_h, box_w = 0.28 * self.height * scale, 0.09 * self.height * scale
+        return [foot_x - box_w / 2, foot_y - box_h, foot_x + box_w / 2, foot_y]
+
+    def _ball_box(self, frame_num):
+        if frame_num in self._hidden_ball:
+            return None
+        rally_frames = int(1.2 * self.fps)
+        progress = (frame_num % rally_frames) / rally_frames
+        if (frame_num // rally_frames) % 2:
+            progress = 1 - progress
+        x_court = COURT_WIDTH / 2 + 3 * np.sin(frame_num / (2.0 * self.fps))
+        y_court = progress * COURT_LENGTH
+        x, y = _to_image([(x_court, y_court)], self._homography)[0]
+        y -= 0.25 * self.height * 4 * progress * (1 - progress)  # the arc above the court
+        radius = max(2.0, self.width / 320)
+        return [x - radius, y - radius, x + radius, y + radius]
+
+    def ground_truth(self, frame_num):
+        """(player dict {1: far, 2: near}, ball dict {1: bbox} or {})"""
+        players = {1: self._player_box(frame_num, far=True), 2: self._player_box(frame_num, far=False)}
+        ball = self._ball_box(frame_num)
+        return players, ({1: ball} if ball is not None else {})
+
+    def frame(self, frame_num):
+        frame = self._background.copy()
+        players, ball = self.ground_truth(frame_num)
+        for track_id, color in ((1, FAR_PLAYER_COLOR), (2, NEAR_PLAYER_COLOR)):
+            x1, y1, x2, y2 = (int(round(v)) for v in players[track_id])
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+        if ball:
+            x1, y1, x2, y2 = ball[1]
+            cv2.circle(frame, (int(round((x1 + x2) / 2)), int(round((y1 + y2) / 2))), int(round((x2 - x1) / 2)),
+                       BALL_COLOR, -1)
+        return frame
+
+    def __iter__(self):
+        for frame_num in range(self.num_frames):
+            yield self.frame(frame_num)
+
+    def write(self, path, codec='mjpg'):
+        with VideoFrameWriter(path, fps=self.fps, codec=codec) as writer:
+            for frame in self:
+                writer.write(frame)
+        return path
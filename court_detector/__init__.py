@@ -1 +1,2 @@
-from .court_detector import CourtLineDetector
\ No newline at end of file
+from .court_detector import CourtLineDetector
+from .court_tracker import CourtKeypointTracker
\ No newline at end of file
@@ -1,20 +1,105 @@
+import json
+import os
 import torch
 import torchvision.transforms as transforms
 import cv2
 from torchvision import models
 import numpy as np
+import sys
+sys.path.append('../')
+from utils import file_digest
+
+FROZEN_EXTENSIONS = ('.ts', '.onnx')
+_warned_stale = set()
+
+def build_keypoint_model(checkpoint_path):
+    """The eager ResNet50 keypoint regressor with the trained weights loaded"""
+    # No ImageNet weights needed: every parameter is overwritten by the checkpoint below
+    model = models.resnet50(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, 14*2)
+    model.load_state_dict(torch.load(checkpoint_path, map_location='cpu'))
+    # Inference only; keeps batchnorm stats frozen so one instance can be shared between jobs
+    model.eval()
+    return model
+
+def export_metadata_path(frozen_path):
+    return frozen_path + '.json'
+
+def is_stale_export(frozen_path, checkpoint_path):
+    """True if the checkpoint changed after frozen_path was exported from it.
+
+    court_detector.export records the checkpoint's sha256 next to the artifact; exports
+    without that record fall back to comparing modification times.
+    """
+    try:
+        with open(export_metadata_path(frozen_path)) as f:
+            source_digest = json.load(f)['source_sha256']
+    except (OSError, ValueError, KeyError):
+        return os.path.getmtime(checkpoint_path) > os.path.getmtime(frozen_path)
+    return source_digest != file_digest(checkpoint_path)
+
+def find_frozen_model(model_path):
+    """A frozen artifact written by court_detector.export next to the checkpoint, if any.
+
+    Artifacts exported from an older version of the checkpoint are skipped with a
+    warning, so retraining never silently runs the previous weights.
+    """
+    root, ext = os.path.splitext(model_path)
+    if ext in FROZEN_EXTENSIONS:
+        return model_path
+    for frozen_ext in FROZEN_EXTENSIONS:
+        frozen_path = root + frozen_ext
+        if not os.path.isfile(frozen_path):
+            continue
+        if os.path.isfile(model_path) and is_stale_export(frozen_path, model_path):
+            if frozen_path not in _warned_stale:
+                _warned_stale.add(frozen_path)
+                print(f"Warning: {frozen_path} was exported from an older {model_path}; ignoring it. "
+                      f"Re-run python -m court_detector.export {model_path}")
+            continue
+        return frozen_path
+    return None
+
+class OnnxKeypointModel:
+    """Callable wrapper so an onnxruntime session can stand in for the torch module"""
+
+    def __init__(self, onnx_path):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("onnxruntime is required to run .onnx court models (pip install onnxruntime)") from e
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, images):
+        outputs = self.session.run(None, {self.input_name: images.contiguous().numpy()})[0]
+        return torch.from_numpy(outputs)
+
+def load_keypoint_model(model_path, prefer_frozen=True):
+    """Load the frozen TorchScript/ONNX artifact when there is one, else the eager checkpoint"""
+    frozen_path = find_frozen_model(model_path) if prefer_frozen else None
+    if frozen_path is None:
+        return build_keypoint_model(model_path)
+    print(f"Loading frozen court model: {frozen_path}")
+    if frozen_path.endswith('.onnx'):
+        return OnnxKeypointModel(frozen_path)
+    return torch.jit.optimize_for_inference(torch.jit.load(frozen_path, map_location='cpu'))
 
 class CourtLineDetector:
-    def __init__(self, model_path):
-        self.model = models.resnet50(pretrained=True)
-        self.model.fc = torch.nn.Linear(self.model.fc.in_features, 14*2) 
-        self.model.load_state_dict(torch.load(model_path, map_location='cpu'))
+    def __init__(self, model_path=None, prefer_frozen=True):
+        # Without a model_path only draw_keypoints is usable (e.g. to render detections made elsewhere)
+        self.model = load_keypoint_model(model_path, prefer_frozen) if model_path is not None else None
         self.transform = transforms.Compose([
             transforms.ToPILImage(),
             transforms.Resize((224, 224)),
             transforms.ToTensor(),
             transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
         ])
+        # Same normalisation as the transform above, shaped to broadcast over NCHW batches
+        self.mean = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+        self.std = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
 
     def predict(self, image):
 
@@ -30,6 +115,27 @@ class CourtLineDetector:
 
         return keypoints
 
+    def predict_batch(self, frames):
+        """Keypoints for a stack of same-sized BGR frames, as an (N, 28) array.
+
+        Resizing and normalisation are done on tensors (antialiased bilinear, which tracks
+        PIL's resize closely) instead of going through PIL one image at a time, and all
+        frames go through the network in one forward pass.
+        """
+        frames = np.ascontiguousarray(np.stack(frames) if isinstance(frames, (list, tuple)) else frames)
+        original_h, original_w = frames.shape[1:3]
+        with torch.inference_mode():
+            # NHWC BGR uint8 -> NCHW RGB float in [0, 1]
+            images = torch.from_numpy(frames).permute(0, 3, 1, 2).flip(1).float().div_(255.0)
+            images = torch.nn.functional.interpolate(
+                images, size=(224, 224), mode='bilinear', align_corners=False, antialias=True
+            )
+            images = (images - self.mean) / self.std
+            keypoints = self.model(images).cpu().numpy()
+        keypoints[:, ::2] *= original_w / 224.0
+        keypoints[:, 1::2] *= original_h / 224.0
+        return keypoints
+
     def draw_keypoints(self, image, keypoints):
         # Plot keypoints on the image
         for i in range(0, len(keypoints), 2):
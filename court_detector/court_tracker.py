@@ -0,0 +1,114 @@
+import cv2
+import numpy as np
+
+class CourtKeypointTracker:
+    """Per-frame court keypoints without running the ResNet on every frame.
+
+    The full CourtLineDetector only runs on keyframes: the first frame, every
+    keyframe_interval frames, after a scene change (camera cut) and whenever tracking
+    is lost. In between, corner features are followed with pyramidal Lucas-Kanade optical
+    flow on a downscaled grey frame, a RANSAC homography is fitted to them, and the last
+    keypoints are carried forward through it.
+    """
+
+    def __init__(self, court_line_detector, keyframe_interval=150, scene_change_threshold=0.6,
+                 min_tracked_points=40, work_width=640):
+        self.court_line_detector = court_line_detector
+        self.keyframe_interval = keyframe_interval
+        self.scene_change_threshold = scene_change_threshold
+        self.min_tracked_points = min_tracked_points
+        self.work_width = work_width
+        self.reset()
+
+    def reset(self):
+        self.keypoints = None
+        self.frames_since_keyframe = 0
+        self.keyframe_count = 0
+        self._prev_gray = None
+        self._prev_points = None
+        self._prev_hist = None
+        self._scale = 1.0
+
+    def get_state(self):
+        """Everything update() carries between frames, as plain values/arrays"""
+        return {
+            'keypoints': self.keypoints, 'frames_since_keyframe': self.frames_since_keyframe,
+            'keyframe_count': self.keyframe_count, 'prev_gray': self._prev_gray,
+            'prev_points': self._prev_points, 'prev_hist': self._prev_hist, 'scale': self._scale,
+        }
+
+    def set_state(self, state):
+        self.keypoints = state['keypoints']
+        self.frames_since_keyframe = state['frames_since_keyframe']
+        self.keyframe_count = state['keyframe_count']
+        self._prev_gray = state['prev_gray']
+        self._prev_points = state['prev_points']
+        self._prev_hist = state['prev_hist']
+        self._scale = state['scale']
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        self._scale = min(1.0, self.work_width / w)
+        small = cv2.resize(frame, (int(w * self._scale), int(h * self._scale)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [32, 32], [0, 180, 0, 256])
+        cv2.normalize(hist, hist)
+        return gray, hist
+
+    def _is_scene_change(self, hist):
+        if self._prev_hist is None:
+            return True
+        return cv2.compareHist(self._prev_hist, hist, cv2.HISTCMP_CORREL) < self.scene_change_threshold
+
+    def _find_features(self, gray):
+        return cv2.goodFeaturesToTrack(gray, maxCorners=400, qualityLevel=0.01, minDistance=8)
+
+    def _keyframe(self, frame, gray):
+        # predict_batch skips the PIL preprocessing that predict goes through
+        self.keypoints = np.asarray(self.court_line_detector.predict_batch(frame[None])[0], dtype=np.float64)
+        self.frames_since_keyframe = 0
+        self.keyframe_count += 1
+        self._prev_points = self._find_features(gray)
+
+    def _track(self, gray):
+        """Carry keypoints forward with a homography; False if too few features survived"""
+        if self._prev_points is None or len(self._prev_points) < self.min_tracked_points:
+            return False
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, self._prev_points, None)
+        good = status.reshape(-1) == 1
+        if good.sum() < self.min_tracked_points:
+            return False
+        src, dst = self._prev_points[good], points[good]
+        homography, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 3.0)
+        if homography is None or inliers.sum() < self.min_tracked_points:
+            return False
+
+        # The homography lives in downscaled coordinates; keypoints are full resolution
+        court_points = (self.keypoints.reshape(-1, 1, 2) * self._scale).astype(np.float32)
+        moved = cv2.perspectiveTransform(court_points, homography) / self._scale
+        self.keypoints = moved.reshape(-1).astype(np.float64)
+        self.frames_since_keyframe += 1
+        # Re-seed features on the inliers so drift and occlusions don't starve the tracker
+        self._prev_points = dst[inliers.reshape(-1) == 1].reshape(-1, 1, 2)
+        if len(self._prev_points) < 2 * self.min_tracked_points:
+            self._prev_points = self._find_features(gray)
+        return True
+
+    def update(self, frame):
+        """Keypoints (x0, y0, x1, y1, ...) for the next frame of the video"""
+        gray, hist = self._prepare(frame)
+        needs_keyframe = (
+            self.keypoints is None
+            or self.frames_since_keyframe >= self.keyframe_interval
+            or self._is_scene_change(hist)
+        )
+        if needs_keyframe or not self._track(gray):
+            self._keyframe(frame, gray)
+        self._prev_gray = gray
+        self._prev_hist = hist
+        return self.keypoints.copy()
+
+    def track_frames(self, frames):
+        """(N, 28) array of keypoints for an iterable of frames"""
+        return np.array([self.update(frame) for frame in frames])
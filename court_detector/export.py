@@ -0,0 +1,79 @@
+"""Freeze the court keypoint model into a TorchScript or ONNX artifact.
+
+Usage: python -m court_detector.export training/keypoints_model.pth --format torchscript
+
+The artifact is written next to the checkpoint (keypoints_model.ts / keypoints_model.onnx)
+unless --output is given, where CourtLineDetector picks it up automatically in place of
+rebuilding the ResNet and loading the state dict. A <artifact>.json file next to it records
+the checkpoint's sha256; once the checkpoint changes the artifact is ignored until re-exported.
+"""
+import argparse
+import json
+import os
+import time
+import torch
+from .court_detector import build_keypoint_model, load_keypoint_model, export_metadata_path
+import sys
+sys.path.append('../')
+from utils import file_digest
+
+def export_torchscript(checkpoint_path, output_path):
+    model = build_keypoint_model(checkpoint_path)
+    example = torch.zeros(1, 3, 224, 224)
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, example)
+    # freeze folds weights and batchnorm into constants; CPU-specific fusions are applied at load
+    # time (see load_keypoint_model) because optimize_for_inference output doesn't reload
+    frozen = torch.jit.freeze(traced)
+    frozen.save(output_path)
+    return output_path
+
+def export_onnx(checkpoint_path, output_path):
+    model = build_keypoint_model(checkpoint_path)
+    torch.onnx.export(
+        model, torch.zeros(1, 3, 224, 224), output_path,
+        input_names=['images'], output_names=['keypoints'],
+        dynamic_axes={'images': {0: 'batch'}, 'keypoints': {0: 'batch'}},
+        opset_version=17,
+    )
+    return output_path
+
+def write_export_metadata(checkpoint_path, output_path):
+    """Record which checkpoint the artifact came from, so find_frozen_model can spot stale exports"""
+    with open(export_metadata_path(output_path), 'w') as f:
+        json.dump({'source_checkpoint': os.path.basename(checkpoint_path),
+                   'source_sha256': file_digest(checkpoint_path)}, f, indent=2)
+
+def time_model(model, runs=10, batch_size=1):
+    images = torch.randn(batch_size, 3, 224, 224)
+    with torch.inference_mode():
+        model(images)
+        start = time.perf_counter()
+        for _ in range(runs):
+            model(images)
+    return (time.perf_counter() - start) / runs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('checkpoint', help='state dict, e.g. training/keypoints_model.pth')
+    parser.add_argument('--format', choices=['torchscript', 'onnx'], default='torchscript')
+    parser.add_argument('--output', help='defaults to the checkpoint path with .ts or .onnx')
+    parser.add_argument('--compare', action='store_true', help='print load time and latency against the eager model')
+    args = parser.parse_args()
+
+    extension = '.ts' if args.format == 'torchscript' else '.onnx'
+    output_path = args.output or os.path.splitext(args.checkpoint)[0] + extension
+    exporter = export_torchscript if args.format == 'torchscript' else export_onnx
+    exporter(args.checkpoint, output_path)
+    write_export_metadata(args.checkpoint, output_path)
+    print(f"Wrote {output_path}")
+
+    if args.compare:
+        for name, path, prefer_frozen in (('eager', args.checkpoint, False), (args.format, output_path, True)):
+            start = time.perf_counter()
+            model = load_keypoint_model(path, prefer_frozen=prefer_frozen)
+            load_time = time.perf_counter() - start
+            print(f"{name:>12}: load {load_time * 1000:7.1f} ms, inference {time_model(model) * 1000:7.1f} ms/frame")
+
+if __name__ == "__main__":
+    main()
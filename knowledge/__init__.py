@@ -0,0 +1,9 @@
+from .bm25 import BM25Index, tokenize
+from .chunking import chunk_json, chunk_markdown, estimate_tokens
+from .context import pack_context
+from .knowledge_base import KnowledgeBase
+from .embeddings import EmbeddingIndex, LSAEmbedder, SentenceTransformerEmbedder
+from .retrieval import hybrid_search
+from .query_expansion import expand_query
+from .response_cache import (ResponseCache, MemoryCacheBackend, SQLiteCacheBackend, response_cache_key,
+                             history_fingerprint, normalize_question)
\ No newline at end of file
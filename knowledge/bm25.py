@@ -0,0 +1,95 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+TOKEN_RX = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about an and are as at be but by can do does for from get how i if in into is it its
+me my of on or should so than that the their them then there these this to too up was
+use what when where which while who why will with you your
+""".split())
+
+def stem(word):
+    """Light suffix stripping so serve/serves/serving and drill/drills share a term"""
+    if len(word) > 4 and word.endswith('ies'):
+        word = word[:-3] + 'y'
+    elif len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    for suffix in ('ing', 'ed', 'e'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def tokenize(text):
+    return [stem(token) for token in TOKEN_RX.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """Inverted index scored with Okapi BM25.
+
+    Documents can be added and removed one at a time; the collection statistics
+    (document count, average length, document frequencies) are kept up to date as
+    they are, so the index never needs a full rebuild.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}     # term -> {doc_id: term frequency}
+        self._doc_terms = {}    # doc_id -> Counter of its terms, for removal
+        self._doc_lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._doc_terms
+
+    @property
+    def vocabulary_size(self):
+        return len(self._postings)
+
+    def add(self, doc_id, text):
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[doc_id]
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+
+    def remove(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query, limit=10, accept=None):
+        """[(doc_id, score), ...] best first, for documents sharing at least one term with query.
+
+        accept(doc_id) can restrict the results, e.g. to one kind of document.
+        """
+        num_docs = len(self._doc_terms)
+        if not num_docs:
+            return []
+        avg_length = self._total_length / num_docs
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings.items():
+                if accept is not None and not accept(doc_id):
+                    continue
+                norm = count + self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * count * (self.k1 + 1) / norm
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
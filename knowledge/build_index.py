@@ -0,0 +1,50 @@
+"""Build the embedding index used for semantic knowledge-base and video search.
+
+Usage: python -m knowledge.build_index
+       python -m knowledge.build_index --model models/all-MiniLM-L6-v2 --query "my topspin lands short"
+
+--model lsa (the default) fits latent semantic analysis on the knowledge base itself and
+needs only numpy; any other value is the directory of a sentence-transformers model that
+has already been downloaded, which is run on CPU. The app maps the index from
+--index-dir (EMBEDDING_INDEX_DIR) at startup.
+"""
+import argparse
+import os
+import time
+from .embeddings import EmbeddingIndex
+from .knowledge_base import KnowledgeBase
+from .retrieval import hybrid_search
+from .query_expansion import expand_query
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--kb-dir', default=os.getenv('KNOWLEDGE_BASE_DIR', 'knowledge_base'))
+    parser.add_argument('--index-dir', default=os.getenv('EMBEDDING_INDEX_DIR', 'cache/embeddings'))
+    parser.add_argument('--model', default=os.getenv('EMBEDDING_MODEL', 'lsa'),
+                        help="'lsa' or a local sentence-transformers model directory")
+    parser.add_argument('--dim', type=int, default=128, help='LSA dimensions')
+    parser.add_argument('--chunk-tokens', type=int, default=int(os.getenv('KNOWLEDGE_CHUNK_TOKENS', 200)),
+                        help='must match the app so chunk IDs line up')
+    parser.add_argument('--query', help='print the top matches for this query after building')
+    args = parser.parse_args()
+
+    knowledge_base = KnowledgeBase(args.kb_dir, chunk_tokens=args.chunk_tokens)
+    index = EmbeddingIndex.build(knowledge_base, args.index_dir, model=args.model, dim=args.dim)
+    print(f"Wrote {args.index_dir}")
+
+    if args.query:
+        expanded = expand_query(args.query)
+        print(f"Expanded query: {expanded}")
+        for kind in ('chunk', 'video'):
+            start = time.perf_counter()
+            semantic = index.search(expanded, kind=kind, limit=5)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"\n{kind} (semantic only, {elapsed:.2f} ms):")
+            for doc_id, similarity in semantic:
+                print(f"  {similarity:.3f}  {knowledge_base.documents[doc_id]['title'][:70]}  [{doc_id}]")
+            print(f"{kind} (hybrid):")
+            for document, score in hybrid_search(knowledge_base, index, args.query, kind=kind, limit=5):
+                print(f"  {score:.3f}  {document['title'][:70]}  [{document['id']}]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+try:
+    import tiktoken
+except ImportError:  # optional: exact counts for the OpenAI tokenizer
+    tiktoken = None
+
+_encoding = None
+
+def estimate_tokens(text):
+    """Token count of text for the chat model; ~4 characters per token without tiktoken"""
+    global _encoding
+    if tiktoken is not None and _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            # The encoding file is downloaded on first use; offline, fall back for good
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+def _label(key):
+    return str(key).replace('_', ' ')
+
+def render_value(value, indent=''):
+    """Nested JSON as an indented outline, much shorter in tokens than indented JSON"""
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                lines.append(f"{indent}{_label(key)}:")
+                lines.append(render_value(item, indent + '  '))
+            else:
+                lines.append(f"{indent}{_label(key)}: {item}")
+        return '\n'.join(lines)
+    if isinstance(value, list):
+        return '\n'.join(render_value(item, indent + '  ') if isinstance(item, (dict, list)) else f"{indent}- {item}"
+                         for item in value)
+    return f"{indent}{value}"
+
+def _pack_runs(parts, max_tokens, separator):
+    """Join consecutive parts into runs of at most max_tokens (a part that is larger stays whole)"""
+    runs, run = [], []
+    for part in parts:
+        if run and estimate_tokens(separator.join(run + [part])) > max_tokens:
+            runs.append(separator.join(run))
+            run = []
+        run.append(part)
+    if run:
+        runs.append(separator.join(run))
+    return runs
+
+def chunk_json(value, max_tokens, path=()):
+    """[(key path, heading path, text), ...] covering value in chunks of about max_tokens.
+
+    Dicts that don't fit are split into their keys, recursively; neighbouring keys that
+    are small are packed back together under their parent's heading.
+    """
+    text = render_value(value)
+    if not isinstance(value, dict) or estimate_tokens(text) <= max_tokens:
+        return [(path, path, text)]
+
+    chunks, run = [], {}
+
+    def flush():
+        if run:
+            chunks.append((path + (next(iter(run)),), path, render_value(run)))
+            run.clear()
+
+    for key, item in value.items():
+        if estimate_tokens(render_value({key: item})) > max_tokens:
+            flush()
+            chunks.extend(chunk_json(item, max_tokens, path + (key,)))
+            continue
+        if run and estimate_tokens(render_value({**run, key: item})) > max_tokens:
+            flush()
+        run[key] = item
+    flush()
+    return chunks
+
+def chunk_markdown(text, max_tokens):
+    """Markdown split at headings, small sections packed together and large ones split by line"""
+    sections, current = [], []
+    for line in text.splitlines():
+        if line.startswith('#') and current:
+            sections.append('\n'.join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        sections.append('\n'.join(current).strip())
+
+    parts = []
+    for section in sections:
+        if estimate_tokens(section) > max_tokens:
+            parts.extend(_pack_runs([line for line in section.splitlines() if line.strip()], max_tokens, '\n'))
+        elif section:
+            parts.append(section)
+    return _pack_runs(parts, max_tokens, '\n\n')
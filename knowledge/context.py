@@ -0,0 +1,27 @@
+from .chunking import estimate_tokens
+
+def format_chunk(document):
+    return f"--- {document['title'].upper()} ---\n{document['text']}"
+
+def pack_context(ranked_chunks, token_budget, min_relative_score=0.3):
+    """(context text, [chunk ids]) from search results, best first, within token_budget.
+
+    Chunks that would overflow the budget are skipped so smaller, lower-ranked ones can
+    still fill it. Chunks scoring under min_relative_score of the best one only matched
+    incidental words and are left out.
+    """
+    if not ranked_chunks:
+        return '', []
+    best_score = ranked_chunks[0][1]
+    blocks, chunk_ids, used = [], [], 0
+    for document, score in ranked_chunks:
+        if score < best_score * min_relative_score:
+            break
+        block = format_chunk(document)
+        tokens = estimate_tokens(block)
+        if used + tokens > token_budget:
+            continue
+        blocks.append(block)
+        chunk_ids.append(document['id'])
+        used += tokens
+    return '\n\n'.join(blocks), chunk_ids
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import Counter
+import numpy as np
+from .bm25 import tokenize
+
+META_FILE = 'meta.json'
+VECTORS_FILE = 'vectors.npy'
+LSA_FILE = 'lsa.npz'
+
+def embedding_text(document):
+    """What gets embedded for a knowledge-base document"""
+    if document['kind'] == 'video':
+        return f"{document['title']} {document['payload'].get('category', '')}"
+    return f"{document['title']}\n{document['text']}"
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _write_atomic(path, write, mode='wb'):
+    # Every gunicorn worker may rebuild the index at import, so each write gets its own temp file
+    tmp_path = os.path.join(os.path.dirname(path), f".tmp-{uuid.uuid4().hex}")
+    try:
+        with open(tmp_path, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+class LSAEmbedder:
+    """Latent semantic analysis fitted on the knowledge base itself.
+
+    TF-IDF vectors are projected onto the top singular vectors of the corpus, so terms
+    that keep appearing together in the knowledge base end up close even when a query
+    only uses one of them. It only knows the associations the corpus itself contains;
+    hybrid_search expands tennis vocabulary the corpus lacks (expand_query) before
+    encoding. Needs nothing but numpy: no weights, no network.
+    """
+    name = 'lsa'
+
+    def __init__(self, vocabulary, idf, projection):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.projection = projection    # (terms, dim)
+
+    @classmethod
+    def fit(cls, texts, dim=128):
+        counts = [Counter(tokenize(text)) for text in texts]
+        vocabulary = {term: i for i, term in enumerate(sorted({term for count in counts for term in count}))}
+        document_frequency = np.zeros(len(vocabulary))
+        for count in counts:
+            document_frequency[[vocabulary[term] for term in count]] += 1
+        idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+        embedder = cls(vocabulary, idf, None)
+        _, _, vt = np.linalg.svd(embedder._tfidf(counts), full_matrices=False)
+        embedder.projection = vt[:dim].T.astype(np.float32)
+        return embedder
+
+    def _tfidf(self, counts):
+        matrix = np.zeros((len(counts), len(self.vocabulary)), dtype=np.float32)
+        for row, count in enumerate(counts):
+            for term, tf in count.items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    matrix[row, column] = (1 + np.log(tf)) * self.idf[column]
+        return _normalize(matrix)
+
+    def encode(self, texts):
+        return _normalize(self._tfidf([Counter(tokenize(text)) for text in texts]) @ self.projection)
+
+    def save(self, index_dir):
+        terms = np.array(sorted(self.vocabulary, key=self.vocabulary.get))
+        _write_atomic(os.path.join(index_dir, LSA_FILE),
+                      lambda f: np.savez(f, terms=terms, idf=self.idf, projection=self.projection))
+
+    @classmethod
+    def load(cls, index_dir):
+        with np.load(os.path.join(index_dir, LSA_FILE)) as data:
+            vocabulary = {term: i for i, term in enumerate(data['terms'].tolist())}
+            return cls(vocabulary, data['idf'], data['projection'])
+
+class SentenceTransformerEmbedder:
+    """A sentence-transformers model loaded from a local directory, on CPU"""
+    name = 'sentence-transformers'
+
+    def __init__(self, model_path):
+        # Imported here so the package stays optional; a local path never touches the network
+        from sentence_transformers import SentenceTransformer
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"{model_path} is not a local sentence-transformers model directory")
+        self.model_path = model_path
+        self.model = SentenceTransformer(model_path, device='cpu')
+
+    def encode(self, texts):
+        return self.model.encode(list(texts), batch_size=64, normalize_embeddings=True,
+                                 convert_to_numpy=True).astype(np.float32)
+
+    def save(self, index_dir):
+        pass
+
+class EmbeddingIndex:
+    """Unit vectors for every knowledge-base chunk and video, memory-mapped from index_dir.
+
+    Built offline by build() (or `python -m knowledge.build_index`); search() embeds the
+    query and scores it against the whole matrix in one matrix-vector product. model is
+    'lsa' or the path of a local sentence-transformers model.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.embedder = None
+        self.model = None
+        self.vectors = None
+        self.ids = []
+        self.hashes = []
+        self._kind_masks = {}
+        self._rows = {}
+
+    @property
+    def loaded(self):
+        return self.vectors is not None
+
+    @classmethod
+    def build(cls, knowledge_base, index_dir, model='lsa', dim=128):
+        start = time.perf_counter()
+        os.makedirs(index_dir, exist_ok=True)
+        documents = sorted(knowledge_base.documents.values(), key=lambda document: document['id'])
+        texts = [embedding_text(document) for document in documents]
+        embedder = LSAEmbedder.fit(texts, dim) if model == 'lsa' else SentenceTransformerEmbedder(model)
+        vectors = embedder.encode(texts)
+
+        embedder.save(index_dir)
+        _write_atomic(os.path.join(index_dir, VECTORS_FILE), lambda f: np.save(f, vectors))
+        # Written last: a reader only trusts vectors.npy whose row count matches the meta
+        meta = {
+            'embedder': embedder.name,
+            'model': model,
+            'dim': int(vectors.shape[1]),
+            'ids': [document['id'] for document in documents],
+            'kinds': [document['kind'] for document in documents],
+            'hashes': [text_hash(text) for text in texts],
+            'built_at': time.time(),
+        }
+        _write_atomic(os.path.join(index_dir, META_FILE), lambda f: json.dump(meta, f), mode='w')
+        print(f"Built {embedder.name} embedding index of {len(documents)} documents in "
+              f"{time.perf_counter() - start:.2f}s")
+        index = cls(index_dir)
+        index.load()
+        return index
+
+    def load(self):
+        """Map the index from disk; False if it is missing, partly written or its model is unavailable"""
+        meta_path = os.path.join(self.index_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            vectors = np.load(os.path.join(self.index_dir, VECTORS_FILE), mmap_mode='r')
+            if vectors.shape[0] != len(meta['ids']):
+                return False
+            if meta['embedder'] == LSAEmbedder.name:
+                embedder = LSAEmbedder.load(self.index_dir)
+            else:
+                embedder = SentenceTransformerEmbedder(meta['model'])
+        except Exception as e:
+            print(f"Could not load embedding index from {self.index_dir}: {e}")
+            return False
+
+        self.embedder = embedder
+        self.model = meta['model']
+        self.vectors = vectors
+        self.ids = meta['ids']
+        self.hashes = meta['hashes']
+        kinds = np.array(meta['kinds'])
+        self._kind_masks = {kind: kinds == kind for kind in set(meta['kinds'])}
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        return True
+
+    def is_stale(self, knowledge_base):
+        """True if any document was added, removed or edited since the index was built"""
+        if len(knowledge_base.documents) != len(self.ids):
+            return True
+        for doc_id, document in list(knowledge_base.documents.items()):
+            row = self._rows.get(doc_id)
+            if row is None or self.hashes[row] != text_hash(embedding_text(document)):
+                return True
+        return False
+
+    def stats(self):
+        return {
+            'embedder': self.embedder.name if self.loaded else None,
+            'documents': len(self.ids),
+            'dim': int(self.vectors.shape[1]) if self.loaded else None,
+        }
+
+    def search(self, query, kind=None, limit=10):
+        """[(doc_id, cosine similarity), ...] best first"""
+        if not self.loaded or not self.ids:
+            return []
+        scores = self.vectors @ self.embedder.encode([query])[0]
+        if kind is not None:
+            mask = self._kind_masks.get(kind)
+            if mask is None:
+                return []
+            scores = np.where(mask, scores, -np.inf)
+        limit = min(limit, len(self.ids))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top if np.isfinite(scores[row])]
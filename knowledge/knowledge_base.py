@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from .bm25 import BM25Index
+from .chunking import chunk_json, chunk_markdown, estimate_tokens
+
+# Written by enhance_knowledge_base_with_web_content; supersedes resources.json when present
+ENHANCED_RESOURCES_FILE = 'resources_enhanced.json'
+
+def _heading(*parts):
+    return ' > '.join(str(part).replace('_', ' ') for part in parts)
+
+def category_documents(category, data, chunk_tokens=200):
+    """(doc_id, kind, title, text, payload) for each searchable unit of one knowledge-base file.
+
+    The topic files and the resources' extracted content are split into 'chunk'
+    documents of about chunk_tokens, pre-rendered for the chat context (payload is that
+    text). Videos are one 'video' document each, with the video dict as payload.
+    """
+    if isinstance(data, list):
+        for i, video in enumerate(data):
+            title = video.get('title', '')
+            yield f"{category}/{i}", 'video', title, f"{title} {video.get('category', '')}", video
+    elif isinstance(data, dict) and isinstance(data.get('tennis_resources'), list):
+        for i, resource in enumerate(data['tennis_resources']):
+            if not resource.get('extracted_content'):
+                continue
+            title = resource.get('Title', '')
+            topics = f"{title} {resource.get('Category', '')} {resource.get('Key_Topics', '')}"
+            for n, text in enumerate(chunk_markdown(resource['extracted_content'], chunk_tokens)):
+                yield f"{category}/{i}#{n}", 'chunk', title, f"{topics} {text}", text
+    elif isinstance(data, dict):
+        for key_path, heading_path, text in chunk_json(data, chunk_tokens):
+            title = _heading(category, *heading_path)
+            yield '/'.join((category, *key_path)), 'chunk', title, f"{title} {text}", text
+
+class KnowledgeBase:
+    """The knowledge_base/*.json files plus a BM25 index over their chunks and videos.
+
+    The index is built once at startup. search() re-stats the files at most every
+    refresh_interval seconds and re-indexes only the ones whose size or mtime changed,
+    so edits (or a new resources_enhanced.json) show up without a restart.
+    """
+
+    def __init__(self, kb_directory='knowledge_base', refresh_interval=5.0, chunk_tokens=200):
+        self.kb_directory = kb_directory
+        self.refresh_interval = refresh_interval
+        self.chunk_tokens = chunk_tokens
+        self.categories = {}
+        self.documents = {}
+        self.index = BM25Index()
+        self._files = {}        # category -> (path, size, mtime_ns) it was loaded from
+        self._checked_at = 0.0
+        self._refresh_ms = None
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def _sources(self):
+        if not os.path.isdir(self.kb_directory):
+            return {}
+        filenames = sorted(name for name in os.listdir(self.kb_directory) if name.endswith('.json'))
+        sources = {}
+        for filename in filenames:
+            category = filename.replace('.json', '')
+            if filename == ENHANCED_RESOURCES_FILE:
+                category = 'resources'
+            elif filename == 'resources.json' and ENHANCED_RESOURCES_FILE in filenames:
+                continue
+            path = os.path.join(self.kb_directory, filename)
+            stat = os.stat(path)
+            sources[category] = (path, stat.st_size, stat.st_mtime_ns)
+        return sources
+
+    def _unload(self, category):
+        self.categories.pop(category, None)
+        self._files.pop(category, None)
+        for doc_id in [doc_id for doc_id, doc in self.documents.items() if doc['category'] == category]:
+            del self.documents[doc_id]
+            self.index.remove(doc_id)
+
+    def refresh(self, force=False):
+        """Re-index changed files; returns the categories that were (re)loaded or dropped"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return []
+        start = time.perf_counter()
+        with self._lock:
+            self._checked_at = now
+            sources = self._sources()
+            changed = [category for category in self._files if category not in sources]
+            for category in changed:
+                self._unload(category)
+
+            for category, source in sources.items():
+                if self._files.get(category) == source:
+                    continue
+                try:
+                    with open(source[0], 'r') as f:
+                        data = json.load(f)
+                except Exception as e:
+                    # Keep serving the last good version of a file that is mid-edit or broken
+                    print(f"Error loading {os.path.basename(source[0])}: {e}")
+                    continue
+                self._unload(category)
+                self.categories[category] = data
+                self._files[category] = source
+                for doc_id, kind, title, text, payload in category_documents(category, data, self.chunk_tokens):
+                    document = {'id': doc_id, 'category': category, 'kind': kind, 'title': title, 'payload': payload}
+                    if kind == 'chunk':
+                        document['text'] = payload
+                        document['tokens'] = estimate_tokens(payload)
+                    self.documents[doc_id] = document
+                    self.index.add(doc_id, text)
+                changed.append(category)
+
+        if changed:
+            self._refresh_ms = round((time.perf_counter() - start) * 1000, 2)
+            print(f"Indexed knowledge base: {', '.join(changed)} ({len(self.documents)} documents)")
+        return changed
+
+    def search(self, query, kind=None, limit=10):
+        """[(document, score), ...] best first; kind limits results to 'chunk' or 'video'"""
+        self.refresh()
+        with self._lock:
+            accept = None if kind is None else (lambda doc_id: self.documents[doc_id]['kind'] == kind)
+            return [(self.documents[doc_id], score) for doc_id, score in self.index.search(query, limit, accept)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'categories': sorted(self.categories),
+                'documents': len(self.documents),
+                'chunks': sum(1 for document in self.documents.values() if document['kind'] == 'chunk'),
+                'terms': self.index.vocabulary_size,
+                'last_refresh_ms': self._refresh_ms,
+            }
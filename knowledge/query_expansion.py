@@ -0,0 +1,54 @@
+import re
+
+# How players describe a problem -> the terms the knowledge base files the advice under.
+# Phrases are matched on the lowercased question before single words.
+PHRASE_EXPANSIONS = {
+    'lands short': 'forehand backhand depth stepping into the shot rotation follow through',
+    'landing short': 'forehand backhand depth stepping into the shot rotation follow through',
+    'falls short': 'forehand backhand depth stepping into the shot rotation follow through',
+    'goes long': 'control contact point grip follow through',
+    'sails long': 'control contact point grip follow through',
+    'into the net': 'contact point follow through',
+    'double fault': 'serve toss consistency',
+    'first serve': 'serve toss power',
+    'second serve': 'serve spin consistency',
+    'at the net': 'volley',
+    'shot selection': 'strategy',
+}
+
+WORD_EXPANSIONS = {
+    'topspin': 'forehand backhand semi-western western grip',
+    'groundstroke': 'forehand backhand',
+    'groundstrokes': 'forehand backhand',
+    'slice': 'backhand continental grip',
+    'kick': 'serve spin',
+    'toss': 'serve',
+    'ace': 'serve',
+    'volleys': 'volley',
+    'poach': 'volley doubles',
+    'smash': 'overhead volley',
+    'overhead': 'volley',
+    'racket': 'racquet',
+    'footwork': 'split step movement',
+    'stamina': 'endurance fitness',
+    'nerves': 'mental strategy',
+    'choke': 'mental strategy',
+}
+
+WORD_RX = re.compile(r"[a-z0-9'-]+")
+
+def expand_query(query):
+    """query plus the knowledge-base terms its tennis vocabulary points to.
+
+    "my topspin lands short" never names a stroke, so keyword and LSA search both miss
+    the forehand and backhand advice; the expansion adds those stroke terms. Each term
+    is added once, and a query with no known vocabulary comes back unchanged.
+    """
+    text = query.lower()
+    extra = [expansion for phrase, expansion in PHRASE_EXPANSIONS.items() if phrase in text]
+    extra += [WORD_EXPANSIONS[word] for word in WORD_RX.findall(text) if word in WORD_EXPANSIONS]
+    terms = []
+    for term in ' '.join(extra).split():
+        if term not in terms and term not in text.split():
+            terms.append(term)
+    return f"{query} {' '.join(terms)}" if terms else query
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import sys
+sys.path.append('../')
+from utils import SQLiteConnections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+def normalize_question(text):
+    """Lowercase words only, so "How do I fix my serve toss?" == "how do i fix my serve toss" """
+    return ' '.join(re.findall(r"[a-z0-9']+", text.lower()))
+
+def history_fingerprint(history, messages=4):
+    """Short hash of the last few user/assistant messages (the system prompt is the same for everyone)"""
+    recent = [(message['role'], normalize_question(message['content']))
+              for message in history if message['role'] != 'system'][-messages:]
+    return hashlib.sha256(json.dumps(recent).encode()).hexdigest()[:16]
+
+def response_cache_key(question, chunk_ids, history_hash, model):
+    """Same question, same retrieved knowledge, same recent conversation and model -> same answer"""
+    parts = [normalize_question(question), sorted(chunk_ids), history_hash, model]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+class MemoryCacheBackend:
+    """Per-process LRU dict; entries are lost on restart and not shared between workers"""
+    name = 'memory'
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (value, expires_at), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        """(value, expired); value is None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            if entry[1] <= now:
+                del self._entries[key]
+                return None, True
+            self._entries.move_to_end(key)
+            return entry[0], False
+
+    def set(self, key, value, expires_at):
+        """Store value; returns how many entries were evicted to make room"""
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SQLiteCacheBackend:
+    """LRU table in a local SQLite file (WAL mode), shared by every worker process on the host"""
+    name = 'sqlite'
+
+    def __init__(self, db_path, max_entries=10000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._connections = SQLiteConnections(db_path)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return self._connections.get()
+
+    def get(self, key, now):
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, False
+        with conn:
+            if row[1] <= now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None, True
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), False
+
+    def set(self, key, value, expires_at):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                         (key, json.dumps(value), expires_at, now))
+            expired = conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+            evicted = conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        return expired + evicted
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+class ResponseCache:
+    """Chat answers keyed by response_cache_key, expiring after ttl_seconds.
+
+    The backend decides where entries live and evicts the least recently used ones past
+    its max_entries. Hit/miss counters are kept per process.
+    """
+
+    def __init__(self, backend, ttl_seconds=24 * 3600):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._counts = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def get(self, key):
+        try:
+            value, expired = self.backend.get(key, time.time())
+        except sqlite3.Error as e:
+            # A cache that can't be read is a miss, never a failed chat request
+            print(f"Response cache read failed: {e}")
+            value, expired = None, False
+        self._count('hits' if value is not None else 'misses')
+        if expired:
+            self._count('expired')
+        return value
+
+    def set(self, key, value):
+        try:
+            evicted = self.backend.set(key, value, time.time() + self.ttl_seconds)
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {e}")
+            return
+        self._count('stores')
+        self._count('evictions', evicted)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['hits'] + counts['misses']
+        return {
+            'backend': self.backend.name,
+            'entries': len(self.backend),
+            'max_entries': self.backend.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hit_rate': round(counts['hits'] / lookups, 3) if lookups else None,
+            **counts,
+        }
@@ -0,0 +1,33 @@
+from .query_expansion import expand_query
+
+def hybrid_search(knowledge_base, embedding_index, query, kind=None, limit=10, semantic_weight=0.5, expand=True):
+    """[(document, score), ...] best first, blending BM25 with embedding similarity.
+
+    BM25 scores are scaled so the best keyword match is 1 and added to the (non-negative)
+    cosine similarity, weighted (1 - semantic_weight) : semantic_weight. Documents the
+    keywords miss entirely can still rank on meaning alone. Without a loaded embedding
+    index this is plain knowledge_base.search. With expand the query first gets the
+    stroke and topic terms its tennis vocabulary implies (see expand_query).
+    """
+    if expand:
+        query = expand_query(query)
+    keyword_results = knowledge_base.search(query, kind=kind, limit=limit * 2)
+    if embedding_index is None or not embedding_index.loaded or semantic_weight <= 0:
+        return keyword_results[:limit]
+
+    scores = {}
+    if keyword_results:
+        best = keyword_results[0][1]
+        for document, score in keyword_results:
+            scores[document['id']] = (1 - semantic_weight) * score / best
+    for doc_id, similarity in embedding_index.search(query, kind=kind, limit=limit * 2):
+        if similarity > 0:
+            scores[doc_id] = scores.get(doc_id, 0.0) + semantic_weight * similarity
+
+    results = []
+    for doc_id, score in sorted(scores.items(), key=lambda item: -item[1]):
+        # Documents dropped from the knowledge base since the embedding index was built
+        document = knowledge_base.documents.get(doc_id)
+        if document is not None:
+            results.append((document, score))
+    return results[:limit]
@@ -1,30 +1,43 @@
-from utils import save_video, read_video
+import argparse
+import os
 from trackers import PlayerTracker, BallTracker
-from court_detector import CourtLineDetector
-def main():
+from court_detector import CourtLineDetector, CourtKeypointTracker
+from pipeline import detect_video, render_video, keypoints_for_frame, get_detection_settings, ANNOTATION_LAYERS, DETECTION_PRESETS
+from utils import video_extension
+def main(track_court=False, detection_preset='quality', layers=ANNOTATION_LAYERS):
     input = 'testingvideos/input_video.mp4'
-    videoframes = read_video(input)
 
     player_tracker = PlayerTracker(model_path = "yolov8x")
-    ball_tracker = BallTracker(model_path = "models/last.pt")
-    player_detections = player_tracker.detect_frames(videoframes, read_from_stub=False, stub_path= "trackers_stubs/player_detections.pkl")
-    ball_detections = ball_tracker.detect_frames(videoframes, read_from_stub=False, stub_path= "trackers_stubs/ball_detections.pkl")
-    ball_detections = ball_tracker.interpolate_ball_positions(ball_detections)
-
+    detection_settings = get_detection_settings(detection_preset)
+    ball_tracker = BallTracker(model_path = "models/last.pt", search_window=detection_settings.ball_search_window)
     court_line_path = 'training/keypoints_model.pth'
     court_line_detector = CourtLineDetector(court_line_path)
-    court_keypoints = court_line_detector.predict(videoframes[0])
-
-    player_detections = player_tracker.choose_and_filter_players(court_keypoints, player_detections)
-
-    output_video_frames = player_tracker.draw_bboxes(videoframes, player_detections)
-    output_video_frames = ball_tracker.draw_bboxes(videoframes, ball_detections)
-
-    output_video_frames = court_line_detector.draw_keypoints_on_video(output_video_frames, court_keypoints)
-
-    save_video(output_video_frames, "outputvideos/output.avi")
+    # Per-frame court keypoints (ResNet only on keyframes/scene cuts) instead of first frame only
+    court_tracker = CourtKeypointTracker(court_line_detector) if track_court else None
+
+    # Frames are streamed from disk twice (detect, then draw + encode) instead of held in a list;
+    # missed ball frames are interpolated as the detections stream in.
+    # detection_preset trades accuracy for speed: 'quality', 'balanced' or 'fast' (pipeline.DETECTION_PRESETS)
+    player_detections, ball_detections, court_keypoints = detect_video(input, player_tracker, ball_tracker, court_line_detector,
+                                                                       batch_size=8, court_tracker=court_tracker,
+                                                                       settings=detection_settings, interpolate_balls=True)
+
+    player_detections = player_tracker.choose_and_filter_players(keypoints_for_frame(court_keypoints, 0), player_detections)
+
+    # One pass draws every selected layer on each frame in place and encodes it; no frame lists.
+    # Keeps the source fps; H.264 .mp4 when ffmpeg is available, MJPG .avi otherwise
+    render_video(input, f"outputvideos/output{video_extension()}", player_detections, ball_detections, court_keypoints,
+                 player_tracker, ball_tracker, court_line_detector, layers=layers)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Detect, annotate and render testingvideos/input_video.mp4")
+    # Same default as the server, so a local run matches what the app would produce
+    parser.add_argument('--preset', choices=list(DETECTION_PRESETS), default=os.getenv('DETECTION_PRESET', 'quality'),
+                        help="detection quality vs speed (default: $DETECTION_PRESET or 'quality')")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(detection_preset=args.preset)
 
 
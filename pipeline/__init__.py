@@ -0,0 +1,10 @@
+from .analysis import detect_video, render_video, keypoints_for_frame
+from .annotation import FrameAnnotator, ANNOTATION_LAYERS, OPTIONAL_LAYERS
+from .detection import DetectionSettings, DETECTION_PRESETS, get_detection_settings
+from .model_registry import ModelRegistry, get_model_registry
+from .sharding import detect_video_sharded, plan_segments, stitch_segments
+from .scheduler import AnalysisScheduler, AnalysisCancelled, QueueFullError
+from .job_store import JobStore
+from .instrumentation import PipelineMetrics, aggregate_metrics
+from .checkpoint import DetectionCheckpoint
+from .analysis_cache import AnalysisCache
\ No newline at end of file
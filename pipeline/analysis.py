@@ -0,0 +1,231 @@
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import numpy as np
+from utils import iter_video_frames, iter_frame_batches, get_video_info, VideoFrameWriter
+from .scheduler import AnalysisCancelled
+from .annotation import FrameAnnotator, ANNOTATION_LAYERS
+from .instrumentation import PipelineMetrics
+from .detection import StridedDetector, get_detection_settings, court_roi, roi_contains
+import sys
+sys.path.append('../')
+from trackers import StreamingInterpolator
+from trackers.ball_tracker import ball_positions_to_array, ball_array_to_positions
+
+def _check_stop(should_stop):
+    if should_stop is not None and should_stop():
+        raise AnalysisCancelled()
+
+def keypoints_for_frame(court_keypoints, frame_num):
+    """court_keypoints is either one (28,) prediction for the whole video or an (N, 28) track"""
+    court_keypoints = np.asarray(court_keypoints)
+    return court_keypoints[frame_num] if court_keypoints.ndim == 2 else court_keypoints
+
+def _tracker_state(players, balls, court_tracker, court_keypoints, roi, next_frame, settings, complete=False):
+    return {
+        'next_frame': next_frame,
+        'complete': complete,
+        'settings': settings.as_dict(),
+        'court_tracking': court_tracker is not None,
+        'court_keypoints': None if court_tracker is not None else court_keypoints,
+        'roi': roi,
+        'player': players.tracker.get_track_state(),
+        'player_last': players._last,
+        'ball': balls.tracker.get_track_state(),
+        'court_tracker': court_tracker.get_state() if court_tracker is not None else None,
+    }
+
+def detect_video(video_path, player_tracker, ball_tracker, court_line_detector, batch_size=8, concurrent=True,
+                 should_stop=None, court_tracker=None, settings=None, checkpoint=None, start_frame=0, num_frames=None,
+                 metrics=None, progress=None, interpolate_balls=False, ball_max_gap=None):
+    """First pass: decode the video once, in small batches, and keep only the detections.
+
+    With concurrent=True the player and ball models run on each batch at the same time
+    in a two-thread pool (torch releases the GIL inside inference), while the main thread
+    decodes the next batch and finds its court keypoints, so the pass costs roughly as
+    much as the slower model. Batches are collected before the next one is submitted so
+    the player tracker always sees frames in order. Court keypoints come from the first
+    frame, unless a CourtKeypointTracker is passed as court_tracker, in which case they
+    are an (N, 28) array with one row per frame.
+
+    settings is a DetectionSettings (or preset name) trading accuracy for speed with
+    detection strides, smaller inference sizes and a court ROI for the player model; the
+    default detects everything on every full frame. The ROI only moves when the court
+    leaves it (e.g. a camera cut) so the player tracker sees stable coordinates.
+
+    With a DetectionCheckpoint, detections and tracker state are saved every
+    checkpoint.chunk_size frames (rounded up to whole batches), and a rerun for the same
+    job seeks to the first unfinished chunk and continues with the same track IDs.
+    start_frame / num_frames restrict the pass to one segment of the video (see
+    detect_video_sharded); the returned lists then cover just that segment.
+
+    metrics (a PipelineMetrics) collects decode, court_detect, player_detect and
+    ball_detect timings; progress(frames_done) is called as batches complete.
+
+    With interpolate_balls=True missed ball frames are filled as the batches come in (a
+    StreamingInterpolator, gaps longer than ball_max_gap stay empty) and the returned
+    ball detections are already interpolated. Checkpoints keep the raw detections.
+    Leave it off for segments, whose gaps can run across the segment boundaries.
+
+    should_stop is polled once per batch; AnalysisCancelled is raised when it returns True.
+    """
+    settings = get_detection_settings(settings or 'quality')
+    metrics = metrics if metrics is not None else PipelineMetrics()
+    players = StridedDetector(player_tracker, settings.player_stride, settings.player_imgsz, carry_forward=True)
+    balls = StridedDetector(ball_tracker, settings.ball_stride, settings.ball_imgsz)
+    player_detections = []
+    ball_detections = []
+    court_keypoints = None
+    tracked_keypoints = []
+    roi = None
+    start_index = start_frame
+    interpolator = StreamingInterpolator(ball_max_gap) if interpolate_balls else None
+    interpolated_balls = []
+
+    def interpolate(new_balls):
+        if interpolator is not None and new_balls:
+            with metrics.stage('interpolate', len(new_balls)):
+                filled = interpolator.push(ball_positions_to_array(new_balls))
+            interpolated_balls.extend(ball_array_to_positions(filled))
+
+    def finish():
+        if court_tracker is not None:
+            keypoints = np.array(tracked_keypoints)
+        else:
+            keypoints = court_keypoints
+        if interpolator is None:
+            return player_detections, ball_detections, keypoints
+        interpolated_balls.extend(ball_array_to_positions(interpolator.flush()))
+        return player_detections, interpolated_balls, keypoints
+
+    chunk_size = None
+    if checkpoint is not None:
+        if start_frame or num_frames is not None:
+            raise ValueError("Checkpoints cover whole videos; they can't be combined with a segment")
+        chunk_size = -(-checkpoint.chunk_size // batch_size) * batch_size
+        resumed = checkpoint.load()
+        if resumed is not None and resumed[0]['settings'] != settings.as_dict():
+            print("Detection settings changed since the last checkpoint; starting over")
+            resumed = None
+        elif resumed is not None and resumed[0].get('court_tracking') != (court_tracker is not None):
+            # One per-frame keypoint track vs a single first-frame prediction; they can't be mixed
+            print("Court tracking was switched since the last checkpoint; starting over")
+            resumed = None
+        if resumed is not None:
+            state, player_detections, ball_detections, tracked_keypoints = resumed
+            start_index = state['next_frame']
+            court_keypoints = state['court_keypoints']
+            roi = state['roi']
+            player_tracker.set_track_state(state['player'])
+            players._last = state['player_last']
+            ball_tracker.set_track_state(state['ball'])
+            if court_tracker is not None:
+                court_tracker.set_state(state['court_tracker'])
+            # Rebuilding the interpolator from the raw detections is cheap next to re-detecting them
+            interpolate(ball_detections)
+            if state['complete']:
+                return finish()
+            print(f"Resuming detection from frame {start_index}")
+    saved_index = start_index
+
+    def save_checkpoint(complete=False):
+        nonlocal saved_index
+        checkpoint.save(
+            saved_index, player_detections[saved_index:], ball_detections[saved_index:],
+            tracked_keypoints[saved_index:],
+            _tracker_state(players, balls, court_tracker, court_keypoints, roi, start_index, settings, complete)
+        )
+        saved_index = start_index
+
+    pending = None
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='detect') if concurrent else None
+
+    def collect():
+        nonlocal pending
+        if pending is not None:
+            player_detections.extend(pending[0].result())
+            new_balls = pending[1].result()
+            ball_detections.extend(new_balls)
+            interpolate(new_balls)
+            pending = None
+            if progress is not None:
+                progress(len(player_detections))
+
+    source = iter_video_frames(video_path, start_frame=start_index)
+    frames = source if num_frames is None else itertools.islice(source, num_frames)
+    frames = metrics.timed_frames('decode', frames)
+    try:
+        for batch in iter_frame_batches(frames, batch_size):
+            _check_stop(should_stop)
+            if chunk_size and start_index > saved_index and start_index % chunk_size == 0:
+                # Everything before start_index is detected and no tracker has seen later frames yet
+                collect()
+                save_checkpoint()
+
+            if court_tracker is not None:
+                with metrics.stage('court_detect', len(batch)):
+                    batch_keypoints = [court_tracker.update(frame) for frame in batch]
+                tracked_keypoints.extend(batch_keypoints)
+                current_keypoints = batch_keypoints[0]
+            else:
+                if court_keypoints is None:
+                    court_keypoints = metrics.timed('court_detect', 1, court_line_detector.predict_batch, batch[:1])[0]
+                current_keypoints = court_keypoints
+            if settings.court_roi:
+                court_box = court_roi(current_keypoints, batch[0].shape)
+                if roi is None or not roi_contains(roi, court_box):
+                    roi = court_box
+
+            if pool is None:
+                player_detections.extend(metrics.timed('player_detect', len(batch), players.detect, batch, start_index, roi))
+                new_balls = metrics.timed('ball_detect', len(batch), balls.detect, batch, start_index)
+                ball_detections.extend(new_balls)
+                interpolate(new_balls)
+                if progress is not None:
+                    progress(len(player_detections))
+            else:
+                collect()
+                pending = (pool.submit(metrics.timed, 'player_detect', len(batch), players.detect, batch, start_index, roi),
+                           pool.submit(metrics.timed, 'ball_detect', len(batch), balls.detect, batch, start_index))
+            start_index += len(batch)
+
+        collect()
+    finally:
+        source.close()
+        if pool is not None:
+            pool.shutdown()
+
+    if checkpoint is not None:
+        save_checkpoint(complete=True)
+    return finish()
+
+def render_video(video_path, output_path, player_detections, ball_detections, court_keypoints,
+                 player_tracker, ball_tracker, court_line_detector, should_stop=None, fps=None, codec='auto',
+                 layers=ANNOTATION_LAYERS, metrics=None, progress=None):
+    """Second pass: decode again, draw the overlays and hand each frame straight to the encoder.
+
+    All selected layers (see FrameAnnotator) are drawn onto the decoded frame in one pass,
+    so no frame is copied or kept after it is written. The output keeps the source frame
+    rate unless fps is given; see VideoFrameWriter for codecs. metrics collects decode,
+    draw and encode timings; progress(frames_done) is called every 32 frames.
+    """
+    if fps is None:
+        fps = get_video_info(video_path)['fps']
+    metrics = metrics if metrics is not None else PipelineMetrics()
+    annotator = FrameAnnotator(player_tracker, ball_tracker, court_line_detector, layers)
+    court_keypoints = np.asarray(court_keypoints)
+    with VideoFrameWriter(output_path, fps=fps, codec=codec) as writer:
+        frames = metrics.timed_frames('decode', iter_video_frames(video_path))
+        for frame_num, (frame, player_dict, ball_dict) in enumerate(zip(frames, player_detections, ball_detections)):
+            if frame_num % 32 == 0:
+                _check_stop(should_stop)
+                if progress is not None:
+                    progress(frame_num)
+            with metrics.stage('draw', 1):
+                annotator.annotate(frame, frame_num, player_dict, ball_dict, keypoints_for_frame(court_keypoints, frame_num))
+            with metrics.stage('encode', 1):
+                writer.write(frame)
+        # Flushing the encoder (ffmpeg finishing its lookahead) is part of encoding too
+        with metrics.stage('encode'):
+            writer.release()
+
+    return writer.frames_written
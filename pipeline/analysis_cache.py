@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import zipfile
+import numpy as np
+import sys
+sys.path.append('../')
+from trackers import TrackStore
+from utils import file_digest
+
+# Bump when the cached payload or the detection logic changes so stale entries stop matching
+CACHE_FORMAT_VERSION = 3
+
+def model_fingerprint(model_paths, settings):
+    """Hash of every model's weights plus the detection thresholds that shape the output.
+
+    model_paths must name files that exist: a bare name like "yolov8x" would hash
+    differently once ultralytics downloads it, orphaning every entry cached before
+    (ModelRegistry.fingerprint resolves them first).
+    """
+    parts = {'version': CACHE_FORMAT_VERSION, 'settings': settings, 'models': {}}
+    for name, path in model_paths.items():
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Cannot fingerprint {name} model: {path} is not a file")
+        parts['models'][name] = file_digest(path)
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+class AnalysisCache:
+    """Content-addressed on-disk cache of finished detections and the rendered video.
+
+    Entries are directories named after sha256(video bytes + model fingerprint). Each one
+    is written to a temp directory and renamed into place, so readers in other processes
+    never see half an entry. Reads touch the directory mtime, and eviction drops the
+    least recently used entries once the cache grows past max_bytes.
+    """
+
+    DETECTIONS_FILE = 'detections.npz'
+    VIDEO_FILE = 'processed_video'
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, video_path, fingerprint):
+        return hashlib.sha256(f"{file_digest(video_path)}:{fingerprint}".encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """Cached detections dict, or None on a miss"""
+        entry_dir = self._entry_dir(key)
+        try:
+            with np.load(os.path.join(entry_dir, self.DETECTIONS_FILE), allow_pickle=False) as arrays:
+                detections = {
+                    'player_detections': TrackStore.from_arrays(arrays, 'player_').to_frame_dicts(),
+                    'ball_detections': TrackStore.from_arrays(arrays, 'ball_').to_frame_dicts(),
+                    'court_keypoints': arrays['court_keypoints'],
+                }
+        except (FileNotFoundError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+        os.utime(entry_dir)
+        return detections
+
+    def copy_video(self, key, output_path):
+        """Copy the cached rendered video to output_path; False if the entry has none"""
+        cached_video = os.path.join(self._entry_dir(key), self.VIDEO_FILE)
+        if not os.path.isfile(cached_video):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        shutil.copyfile(cached_video, output_path)
+        return True
+
+    def put(self, key, detections, video_path=None):
+        entry_dir = self._entry_dir(key)
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            with open(os.path.join(tmp_dir, self.DETECTIONS_FILE), 'wb') as f:
+                np.savez(
+                    f,
+                    court_keypoints=np.asarray(detections['court_keypoints']),
+                    **TrackStore.from_frame_dicts(detections['player_detections']).to_arrays('player_'),
+                    **TrackStore.from_frame_dicts(detections['ball_detections']).to_arrays('ball_')
+                )
+            if video_path is not None:
+                shutil.copyfile(video_path, os.path.join(tmp_dir, self.VIDEO_FILE))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            # Another worker may have stored the same entry first; either copy is fine
+            print(f"Could not store analysis cache entry {key[:12]}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if name.startswith('.tmp-') or not os.path.isdir(entry_dir):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+                entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+            except FileNotFoundError:
+                continue  # evicted by another process mid-scan
+        return entries
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            'entries': len(entries),
+            'size_bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
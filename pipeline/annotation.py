@@ -0,0 +1,36 @@
+import cv2
+import numpy as np
+
+ANNOTATION_LAYERS = ('players', 'ball', 'court')
+OPTIONAL_LAYERS = ('frame_number',)
+
+class FrameAnnotator:
+    """Draws the selected overlay layers onto one frame, in place.
+
+    Replaces chaining draw_bboxes / draw_keypoints_on_video, which each walk the whole
+    frame list and build a new one: here every layer is drawn on the frame while it is
+    in hand, so a renderer can go decode -> annotate -> encode with no frame list at all.
+    layers is any subset of ANNOTATION_LAYERS + OPTIONAL_LAYERS, drawn in that order.
+    """
+
+    def __init__(self, player_tracker, ball_tracker, court_line_detector, layers=ANNOTATION_LAYERS):
+        unknown = set(layers) - set(ANNOTATION_LAYERS + OPTIONAL_LAYERS)
+        if unknown:
+            raise ValueError(f"Unknown annotation layers: {', '.join(sorted(unknown))}")
+        self.player_tracker = player_tracker
+        self.ball_tracker = ball_tracker
+        self.court_line_detector = court_line_detector
+        self.layers = [layer for layer in ANNOTATION_LAYERS + OPTIONAL_LAYERS if layer in layers]
+
+    def annotate(self, frame, frame_num, player_dict=None, ball_dict=None, court_keypoints=None):
+        """Draw onto frame (no copy) and return it"""
+        for layer in self.layers:
+            if layer == 'players' and player_dict:
+                self.player_tracker.draw_frame_bboxes(frame, player_dict)
+            elif layer == 'ball' and ball_dict:
+                self.ball_tracker.draw_frame_bboxes(frame, ball_dict)
+            elif layer == 'court' and court_keypoints is not None and not np.isnan(court_keypoints).any():
+                self.court_line_detector.draw_keypoints(frame, court_keypoints)
+            elif layer == 'frame_number':
+                cv2.putText(frame, f"Frame: {frame_num}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        return frame
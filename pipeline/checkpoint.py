@@ -0,0 +1,89 @@
+import glob
+import hashlib
+import hmac
+import os
+import pickle
+import shutil
+import uuid
+import numpy as np
+import sys
+sys.path.append('../')
+from trackers import TrackStore
+
+class DetectionCheckpoint:
+    """Resumable detect_video progress for one job, kept in its own directory.
+
+    Every chunk_size frames detect_video saves that chunk's detections as
+    chunk_<first frame>.npz (TrackStore arrays, as in the analysis cache), then state.pkl
+    with the frame to resume from and the tracker state that keeps track IDs continuous
+    (player tracks, ball motion model, court tracker, ROI). Each file is written under a
+    temp name and renamed, state last, so a crash leaves the previous checkpoint intact.
+    state.pkl is a pickle because the ultralytics tracker objects have no other serialised
+    form, so it starts with an HMAC-SHA256 of the pickle keyed by secret_key (the app's
+    SECRET_KEY) and load() refuses to unpickle a state whose signature doesn't match.
+    """
+
+    STATE_FILE = 'state.pkl'
+
+    def __init__(self, checkpoint_dir, secret_key, chunk_size=600):
+        self.checkpoint_dir = checkpoint_dir
+        self.secret_key = secret_key.encode() if isinstance(secret_key, str) else secret_key
+        self.chunk_size = chunk_size
+
+    def _sign(self, payload):
+        return hmac.new(self.secret_key, payload, hashlib.sha256).digest()
+
+    def _write_atomic(self, name, write):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        tmp_path = os.path.join(self.checkpoint_dir, f".tmp-{uuid.uuid4().hex}")
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, os.path.join(self.checkpoint_dir, name))
+
+    def save(self, start_frame, player_detections, ball_detections, court_keypoints, state):
+        """Store detections for frames start_frame.. and then the state to resume from"""
+        arrays = {
+            'court_keypoints': np.asarray(court_keypoints, dtype=np.float64),
+            **TrackStore.from_frame_dicts(player_detections).to_arrays('player_'),
+            **TrackStore.from_frame_dicts(ball_detections).to_arrays('ball_'),
+        }
+        if len(player_detections):
+            self._write_atomic(f"chunk_{start_frame:09d}.npz", lambda f: np.savez(f, **arrays))
+        payload = pickle.dumps(state)
+        self._write_atomic(self.STATE_FILE, lambda f: f.write(self._sign(payload) + payload))
+
+    def load(self):
+        """(state, player_detections, ball_detections, tracked court keypoints) or None if there is no checkpoint"""
+        try:
+            with open(os.path.join(self.checkpoint_dir, self.STATE_FILE), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        digest_size = hashlib.sha256().digest_size
+        signature, payload = data[:digest_size], data[digest_size:]
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            print(f"Ignoring checkpoint in {self.checkpoint_dir}: signature check failed")
+            return None
+        try:
+            state = pickle.loads(payload)
+        except (EOFError, pickle.UnpicklingError):
+            return None
+
+        player_detections, ball_detections, court_rows = [], [], []
+        for path in sorted(glob.glob(os.path.join(self.checkpoint_dir, 'chunk_*.npz'))):
+            start_frame = int(os.path.basename(path)[len('chunk_'):-len('.npz')])
+            # A chunk written after the last state file was saved is redone on resume
+            if start_frame >= state['next_frame']:
+                continue
+            with np.load(path, allow_pickle=False) as arrays:
+                player_detections.extend(TrackStore.from_arrays(arrays, 'player_').to_frame_dicts())
+                ball_detections.extend(TrackStore.from_arrays(arrays, 'ball_').to_frame_dicts())
+                court_rows.extend(arrays['court_keypoints'])
+
+        if len(player_detections) != state['next_frame']:
+            print(f"Discarding incomplete checkpoint in {self.checkpoint_dir}")
+            return None
+        return state, player_detections, ball_detections, court_rows
+
+    def clear(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
@@ -0,0 +1,101 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:  # Windows has no getrusage
+    resource = None
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class PipelineMetrics:
+    """Wall time, frames and peak RSS per stage of one analysis.
+
+    Stages are decode, court_detect, player_detect, ball_detect, interpolate, filter,
+    draw and encode (see detect_video / render_video). Each keeps its own wall time, so
+    stages that overlap (the player and ball models run side by side, decoding runs
+    ahead on its own thread and only the time spent waiting for frames is counted)
+    can add up to more than the job's total. peak_rss_mb is the process peak when the
+    stage last ran, which includes anything else the worker process is doing.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, frames=0):
+        with self._lock:
+            stage = self._stages.setdefault(name, {'seconds': 0.0, 'frames': 0})
+            stage['seconds'] += seconds
+            stage['frames'] += frames
+            stage['peak_rss_mb'] = peak_rss_mb()
+
+    @contextmanager
+    def stage(self, name, frames=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, frames)
+
+    def timed(self, name, frames, func, *args):
+        """func(*args) counted as one call of stage name covering frames frames"""
+        with self.stage(name, frames):
+            return func(*args)
+
+    def timed_frames(self, name, frames):
+        """Pass frames through, counting the time spent waiting for each one as stage name"""
+        frames = iter(frames)
+        while True:
+            start = time.perf_counter()
+            try:
+                frame = next(frames)
+            except StopIteration:
+                return
+            self.add(name, time.perf_counter() - start, 1)
+            yield frame
+
+    def totals(self):
+        """{stage: (seconds, frames)} so far, for merging into another process's metrics"""
+        with self._lock:
+            return {name: (stage['seconds'], stage['frames']) for name, stage in self._stages.items()}
+
+    def summary(self):
+        with self._lock:
+            stages = {
+                name: {
+                    'seconds': round(stage['seconds'], 3),
+                    'frames': stage['frames'],
+                    'fps': round(stage['frames'] / stage['seconds'], 1) if stage['frames'] and stage['seconds'] else None,
+                    'peak_rss_mb': stage['peak_rss_mb'],
+                }
+                for name, stage in self._stages.items()
+            }
+        return {
+            'wall_seconds': round(time.time() - self.started_at, 3),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+        }
+
+def aggregate_metrics(summaries):
+    """Totals and mean fps per stage over several jobs' summary() dicts"""
+    stages = {}
+    for summary in summaries:
+        for name, stage in summary.get('stages', {}).items():
+            total = stages.setdefault(name, {'seconds': 0.0, 'frames': 0, 'jobs': 0})
+            total['seconds'] += stage['seconds']
+            total['frames'] += stage['frames']
+            total['jobs'] += 1
+    for total in stages.values():
+        total['seconds'] = round(total['seconds'], 3)
+        total['fps'] = round(total['frames'] / total['seconds'], 1) if total['frames'] and total['seconds'] else None
+    peaks = [summary['peak_rss_mb'] for summary in summaries if summary.get('peak_rss_mb') is not None]
+    return {'jobs': len(summaries), 'max_peak_rss_mb': max(peaks) if peaks else None, 'stages': stages}
@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+import sys
+sys.path.append('../')
+from utils import SQLiteConnections
+
+JOB_COLUMNS = ('status', 'progress', 'filename', 'upload_path', 'error', 'worker_id', 'cancel_requested', 'metrics')
+ACTIVE_STATUSES = ('queued', 'analyzing')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    filename TEXT,
+    upload_path TEXT,
+    error TEXT,
+    worker_id TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    metrics TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT PRIMARY KEY REFERENCES jobs (job_id) ON DELETE CASCADE,
+    result TEXT NOT NULL
+);
+"""
+
+def _worker_alive(worker_id, my_worker_id):
+    """Worker ids are '<pid>-<random>', so a restarted process that reuses a pid is told apart"""
+    if worker_id == my_worker_id:
+        return True
+    if not worker_id:
+        return False
+    pid = int(worker_id.split('-', 1)[0])
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobStore:
+    """SQLite-backed analysis job state shared by every worker process.
+
+    The database runs in WAL mode so status polls never block the worker writing
+    progress. Small status fields live in `jobs`; the finished analysis (coaching
+    feedback etc.) is a JSON blob in `job_results` that is only read once a job
+    has completed.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._connections = SQLiteConnections(db_path, row_factory=sqlite3.Row, foreign_keys=True)
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Databases created before per-stage metrics existed
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'metrics' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN metrics TEXT")
+
+    def _connect(self):
+        return self._connections.get()
+
+    def create(self, job_id, status='queued', **fields):
+        now = time.time()
+        fields = {'status': status, 'worker_id': self.worker_id, **fields}
+        self._check_columns(fields)
+        columns = ', '.join(['job_id', *fields, 'created_at', 'updated_at'])
+        placeholders = ', '.join('?' * (len(fields) + 3))
+        with self._connect() as conn:
+            conn.execute(f"INSERT INTO jobs ({columns}) VALUES ({placeholders})",
+                         (job_id, *fields.values(), now, now))
+
+    def update(self, job_id, **fields):
+        """Set job fields; metrics may be passed as a dict and is stored as JSON"""
+        self._check_columns(fields)
+        if isinstance(fields.get('metrics'), dict):
+            fields['metrics'] = json.dumps(fields['metrics'])
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+                         (*fields.values(), time.time(), job_id))
+
+    def complete(self, job_id, **result):
+        """Store the result blob and mark the job completed in one transaction"""
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO job_results (job_id, result) VALUES (?, ?)",
+                         (job_id, json.dumps(result)))
+            conn.execute("UPDATE jobs SET status = 'completed', progress = 100, updated_at = ? WHERE job_id = ?",
+                         (time.time(), job_id))
+
+    def get(self, job_id, include_result=True):
+        """Job fields as a dict (None if unknown); the result blob is only read for completed jobs.
+
+        The server-side upload path is left out since this is what the API returns.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT status, progress, filename, error, metrics FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = {key: row[key] for key in row.keys() if row[key] is not None}
+        if 'metrics' in job:
+            job['metrics'] = json.loads(job['metrics'])
+        if include_result and job['status'] == 'completed':
+            result_row = conn.execute("SELECT result FROM job_results WHERE job_id = ?", (job_id,)).fetchone()
+            if result_row is not None:
+                job.update(json.loads(result_row['result']))
+        return job
+
+    def queue_position(self, job_id):
+        """1-based position among the jobs waiting in every worker process, None unless job_id is queued"""
+        conn = self._connect()
+        row = conn.execute("SELECT created_at FROM jobs WHERE job_id = ? AND status = 'queued'", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND (created_at < ? OR (created_at = ? AND job_id <= ?))",
+            (row['created_at'], row['created_at'], job_id)).fetchone()[0]
+
+    def recent_metrics(self, limit=100):
+        """Stage metrics of the most recently completed jobs, newest first"""
+        rows = self._connect().execute(
+            "SELECT metrics FROM jobs WHERE status = 'completed' AND metrics IS NOT NULL "
+            "ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        return [json.loads(row['metrics']) for row in rows]
+
+    def delete(self, job_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def request_cancel(self, job_id):
+        """Flag an active job for cancellation; the process running it picks this up"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET cancel_requested = 1, updated_at = ? "
+                f"WHERE job_id = ? AND status IN ({', '.join('?' * len(ACTIVE_STATUSES))})",
+                (time.time(), job_id, *ACTIVE_STATUSES))
+            return cursor.rowcount > 0
+
+    def is_cancel_requested(self, job_id):
+        row = self._connect().execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def claim_orphaned_jobs(self):
+        """Take over active jobs whose worker process has died (e.g. after a crash or restart).
+
+        The owner id is swapped with a compare-and-set UPDATE, so when several workers
+        start at once each orphaned job is claimed by exactly one of them.
+        """
+        conn = self._connect()
+        rows = conn.execute(
+            f"SELECT job_id, upload_path, worker_id, cancel_requested FROM jobs "
+            f"WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))}) ORDER BY created_at",
+            ACTIVE_STATUSES).fetchall()
+        claimed = []
+        for row in rows:
+            if _worker_alive(row['worker_id'], self.worker_id):
+                continue
+            # Jobs cancelled while their worker was down are closed instead of resumed
+            status = 'cancelled' if row['cancel_requested'] else 'queued'
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE jobs SET worker_id = ?, status = ?, updated_at = ? "
+                    "WHERE job_id = ? AND worker_id IS ?",
+                    (self.worker_id, status, time.time(), row['job_id'], row['worker_id']))
+            if cursor.rowcount and status == 'queued':
+                claimed.append((row['job_id'], row['upload_path']))
+        return claimed
+
+    def _check_columns(self, fields):
+        unknown = set(fields) - set(JOB_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
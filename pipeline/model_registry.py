@@ -0,0 +1,112 @@
+import copy
+import threading
+import numpy as np
+from ultralytics import YOLO
+import sys
+sys.path.append('../')
+from trackers import PlayerTracker, BallTracker
+from court_detector import CourtLineDetector
+from court_detector.court_detector import find_frozen_model
+from .analysis_cache import model_fingerprint
+
+PLAYER_MODEL_PATH = "yolov8x"
+BALL_MODEL_PATH = "models/last.pt"
+COURT_MODEL_PATH = "training/keypoints_model.pth"
+
+def _yolo_session(shared_model):
+    """Cheap per-job view of a loaded YOLO model.
+
+    The network weights are shared, but the copy gets its own predictor (and so its own
+    persistent track state) and its own callback lists, since model.track registers
+    tracker callbacks on the model it is called on.
+    """
+    session = copy.copy(shared_model)
+    session.predictor = None
+    session.callbacks = {event: list(funcs) for event, funcs in shared_model.callbacks.items()}
+    return session
+
+class ModelRegistry:
+    """Loads each model once per process and hands out trackers that share the weights"""
+
+    def __init__(self, player_model_path=PLAYER_MODEL_PATH, ball_model_path=BALL_MODEL_PATH,
+                 court_model_path=COURT_MODEL_PATH):
+        self.player_model_path = player_model_path
+        self.ball_model_path = ball_model_path
+        self.court_model_path = court_model_path
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, loader):
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            # Another job may have finished loading while we waited for the lock
+            if key not in self._models:
+                print(f"Loading {key} model...")
+                self._models[key] = loader()
+            return self._models[key]
+
+    def _load_yolo(self, model_path):
+        model = YOLO(model_path)
+        # Warm-up pass builds and fuses the network once, before any session copies it
+        model.predict(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+        return model
+
+    def _load_court_detector(self):
+        detector = CourtLineDetector(self.court_model_path)
+        detector.predict_batch(np.zeros((1, 224, 224, 3), dtype=np.uint8))
+        return detector
+
+    def player_tracker(self):
+        """New PlayerTracker per job: shared weights, fresh track IDs"""
+        shared = self._get('player', lambda: self._load_yolo(self.player_model_path))
+        return PlayerTracker(model=_yolo_session(shared))
+
+    def ball_tracker(self, search_window=None):
+        shared = self._get('ball', lambda: self._load_yolo(self.ball_model_path))
+        return BallTracker(model=_yolo_session(shared), search_window=search_window)
+
+    def court_line_detector(self):
+        # Stateless at inference time, so one instance serves every job
+        return self._get('court', self._load_court_detector)
+
+    def model_paths(self):
+        """Constructor arguments for an equivalent registry in another process"""
+        return {'player_model_path': self.player_model_path, 'ball_model_path': self.ball_model_path,
+                'court_model_path': self.court_model_path}
+
+    def _weights_file(self, key, model_path):
+        # Loading resolves names like "yolov8x" to the local .pt file, downloading it first if needed
+        model = self._get(key, lambda: self._load_yolo(model_path))
+        return getattr(model, 'ckpt_path', None) or model_path
+
+    def fingerprint(self, **settings):
+        """Identifies the weights and thresholds behind a set of detections (for AnalysisCache).
+
+        The YOLO models are loaded first so the fingerprint always hashes the weight files
+        they were loaded from, before and after ultralytics downloads them. Pass any other
+        option that changes the stored detections as a keyword argument.
+        """
+        return model_fingerprint(
+            {'player': self._weights_file('player', self.player_model_path),
+             'ball': self._weights_file('ball', self.ball_model_path),
+             'court': find_frozen_model(self.court_model_path) or self.court_model_path},
+            {'ball_conf': BallTracker.conf_threshold, **settings}
+        )
+
+    def warm_up(self):
+        self.player_tracker()
+        self.ball_tracker()
+        self.court_line_detector()
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry():
+    """Process-wide registry; each worker process loads its own copy of the weights once"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
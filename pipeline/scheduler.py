@@ -0,0 +1,85 @@
+import threading
+from collections import deque
+
+class QueueFullError(Exception):
+    pass
+
+class AnalysisCancelled(Exception):
+    pass
+
+class AnalysisScheduler:
+    """Fixed pool of worker threads pulling analysis jobs from a bounded FIFO queue.
+
+    handler(job_id, *args) is called on a worker thread. Running jobs are cancelled
+    cooperatively: the handler polls is_cancelled(job_id) and stops by raising
+    AnalysisCancelled.
+    """
+
+    def __init__(self, handler, num_workers=1, max_queue_size=8):
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self._queue = deque()
+        self._running = set()
+        self._cancelled = set()
+        self._cond = threading.Condition()
+        self._workers = []
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"analysis-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def is_full(self):
+        with self._cond:
+            return len(self._queue) >= self.max_queue_size
+
+    def submit(self, job_id, *args):
+        with self._cond:
+            if len(self._queue) >= self.max_queue_size:
+                raise QueueFullError(f"Analysis queue is full ({self.max_queue_size} jobs waiting)")
+            self._queue.append((job_id, args))
+            self._cond.notify()
+            return len(self._queue)
+
+    def cancel(self, job_id):
+        """Drop a waiting job, or flag a running one. Returns 'dequeued', 'cancelling' or None"""
+        with self._cond:
+            for item in self._queue:
+                if item[0] == job_id:
+                    self._queue.remove(item)
+                    return 'dequeued'
+            if job_id in self._running:
+                self._cancelled.add(job_id)
+                return 'cancelling'
+            return None
+
+    def is_cancelled(self, job_id):
+        return job_id in self._cancelled
+
+    def stats(self):
+        with self._cond:
+            return {
+                'workers': self.num_workers,
+                'running': len(self._running),
+                'queued': len(self._queue),
+                'max_queue_size': self.max_queue_size,
+            }
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job_id, args = self._queue.popleft()
+                self._running.add(job_id)
+            try:
+                self.handler(job_id, *args)
+            except AnalysisCancelled:
+                pass
+            except Exception as e:
+                # Handlers record their own errors; this only keeps the worker alive
+                print(f"Unhandled error in analysis job {job_id}: {e}")
+            finally:
+                with self._cond:
+                    self._running.discard(job_id)
+                    self._cancelled.discard(job_id)
@@ -0,0 +1,215 @@
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+import numpy as np
+import sys
+sys.path.append('../')
+from court_detector import CourtKeypointTracker
+from utils import get_video_info
+from .analysis import detect_video, _check_stop
+from .detection import get_detection_settings
+from .instrumentation import PipelineMetrics
+from .model_registry import ModelRegistry
+
+def plan_segments(frame_count, num_workers, min_segment_frames=900):
+    """[(start, end), ...] splitting frame_count into at most num_workers equal segments.
+
+    Segments shorter than min_segment_frames aren't worth a process (each one loads the
+    models and warms up its trackers), so short clips get fewer segments.
+    """
+    num_segments = max(1, min(num_workers, frame_count // max(1, min_segment_frames)))
+    bounds = np.linspace(0, frame_count, num_segments + 1).astype(int).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+def _center(bbox):
+    return np.array([(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2])
+
+def match_tracks(prev_detections, next_detections, iou_threshold=0.3):
+    """{next track id: prev track id} for the same objects seen by two segments.
+
+    prev_detections and next_detections cover the same overlap frames. Pairs are ranked by
+    their mean IoU over the overlap and matched greedily. Tracks left over are matched by
+    position: the next track's first centre against the prev track's last centre, accepted
+    within one box height. With no overlap frames, only the position pass applies to the
+    prev segment's last frame and the next segment's first.
+    """
+    iou_sums = {}
+    for prev_dict, next_dict in zip(prev_detections, next_detections):
+        for prev_id, prev_bbox in prev_dict.items():
+            for next_id, next_bbox in next_dict.items():
+                iou = box_iou(prev_bbox, next_bbox)
+                if iou > 0:
+                    iou_sums[(prev_id, next_id)] = iou_sums.get((prev_id, next_id), 0.0) + iou
+
+    frames = max(1, min(len(prev_detections), len(next_detections)))
+    matches = {}
+    for (prev_id, next_id), iou_sum in sorted(iou_sums.items(), key=lambda item: -item[1]):
+        if iou_sum / frames < iou_threshold:
+            break
+        if next_id not in matches and prev_id not in matches.values():
+            matches[next_id] = prev_id
+
+    last_prev = {}
+    for prev_dict in prev_detections:
+        last_prev.update(prev_dict)
+    first_next = {}
+    for next_dict in reversed(next_detections):
+        first_next.update(next_dict)
+    for next_id, next_bbox in first_next.items():
+        if next_id in matches:
+            continue
+        candidates = [(np.linalg.norm(_center(next_bbox) - _center(prev_bbox)), prev_id)
+                      for prev_id, prev_bbox in last_prev.items() if prev_id not in matches.values()]
+        if candidates:
+            distance, prev_id = min(candidates)
+            if distance <= next_bbox[3] - next_bbox[1]:
+                matches[next_id] = prev_id
+    return matches
+
+def stitch_segments(segment_results, overlaps):
+    """Join per-segment (player, ball, court) detections into one video's worth.
+
+    overlaps[k] is how many leading frames of segment k repeat the end of segment k-1
+    (overlaps[0] is 0). Those frames are taken from the earlier segment, whose trackers
+    were already warmed up, and used only to link segment k's player IDs to the earlier ones.
+    Unlinked tracks get fresh IDs so separate players never share one.
+    """
+    player_detections, ball_detections, court_rows = [], [], []
+    court_keypoints = None
+    next_free_id = 1
+    for k, ((players, balls, court), overlap) in enumerate(zip(segment_results, overlaps)):
+        if k == 0:
+            matches = {}
+        else:
+            prev_tail = player_detections[len(player_detections) - overlap:] if overlap else player_detections[-1:]
+            matches = match_tracks(prev_tail, players[:overlap] if overlap else players[:1])
+        # Matched IDs continue the earlier segment's (already remapped) track
+        segment_map = dict(matches)
+        for frame_dict in players:
+            for track_id in frame_dict:
+                if track_id not in segment_map:
+                    segment_map[track_id] = next_free_id
+                    next_free_id += 1
+
+        player_detections.extend({segment_map[track_id]: bbox for track_id, bbox in frame_dict.items()}
+                                 for frame_dict in players[overlap:])
+        ball_detections.extend(balls[overlap:])
+        court = np.asarray(court)
+        if court.ndim == 2:
+            court_rows.extend(court[overlap:])
+        elif court_keypoints is None:
+            court_keypoints = court
+    return player_detections, ball_detections, np.array(court_rows) if court_rows else court_keypoints
+
+def _init_segment_worker(torch_threads):
+    # Split the cores between segment processes instead of every process claiming all of them
+    import torch
+    torch.set_num_threads(torch_threads)
+
+def _detect_segment(index, video_path, start_frame, num_frames, model_paths, settings, batch_size, track_court,
+                    stop_event, reports):
+    # Every batch sends (segment, frames done, stage totals so far) back to the parent
+    metrics = PipelineMetrics()
+    report = lambda frames_done: reports.put((index, frames_done, metrics.totals()))
+    registry = ModelRegistry(**model_paths)
+    court_line_detector = registry.court_line_detector()
+    detections = detect_video(
+        video_path, registry.player_tracker(), registry.ball_tracker(search_window=settings.ball_search_window),
+        court_line_detector, batch_size=batch_size, should_stop=stop_event.is_set,
+        court_tracker=CourtKeypointTracker(court_line_detector) if track_court else None,
+        settings=settings, start_frame=start_frame, num_frames=num_frames, metrics=metrics, progress=report
+    )
+    report(len(detections[0]))
+    return detections
+
+class _SegmentReports:
+    """Folds the segments' cumulative reports into one frame count and the parent's metrics"""
+
+    def __init__(self, overlaps, metrics, progress):
+        self.overlaps = overlaps
+        self.metrics = metrics
+        self.progress = progress
+        self._frames = [0] * len(overlaps)
+        self._totals = [{} for _ in overlaps]
+
+    def drain(self, reports):
+        updated = False
+        while True:
+            try:
+                index, frames_done, totals = reports.get_nowait()
+            except queue.Empty:
+                break
+            # Overlap frames are detected twice; count each video frame once
+            self._frames[index] = max(0, frames_done - self.overlaps[index])
+            previous = self._totals[index]
+            for name, (seconds, frames) in totals.items():
+                prev_seconds, prev_frames = previous.get(name, (0.0, 0))
+                self.metrics.add(name, seconds - prev_seconds, frames - prev_frames)
+            self._totals[index] = totals
+            updated = True
+        if updated and self.progress is not None:
+            self.progress(sum(self._frames))
+
+def detect_video_sharded(video_path, num_workers, model_paths, settings=None, batch_size=8, track_court=False,
+                         should_stop=None, overlap=30, min_segment_frames=900, metrics=None, progress=None):
+    """detect_video for long matches, split into time segments run by separate processes.
+
+    Each process loads its own models, seeks straight to its segment's first frame and
+    starts overlap frames early so its player tracks can be linked to the previous
+    segment's (see stitch_segments). model_paths holds the ModelRegistry constructor
+    arguments. Court keypoints come from the first segment, or are tracked per segment
+    with track_court. Returns the same (player, ball, court) triple as detect_video.
+
+    The segments report back through a Manager queue after every batch: progress(frames_done)
+    gets the frames detected across all segments, and metrics (a PipelineMetrics) the
+    sum of their per-stage timings. peak_rss_mb in those stages is this process's own.
+
+    Segments are not checkpointed (detect_video only checkpoints whole videos), so a
+    crash restarts the sharded pass from the first frame.
+
+    The processes are spawned, so each one re-imports the calling script as __mp_main__;
+    a script that starts services at import time should skip them there (see app.py).
+    """
+    settings = get_detection_settings(settings or 'quality')
+    frame_count = get_video_info(video_path)['frame_count']
+    segments = plan_segments(frame_count, num_workers, min_segment_frames)
+    overlaps = [0] + [min(overlap, start) for start, _ in segments[1:]]
+    print(f"Detecting {frame_count} frames in {len(segments)} segment process(es)")
+
+    context = multiprocessing.get_context('spawn')
+    torch_threads = max(1, (os.cpu_count() or 1) // len(segments))
+    metrics = metrics if metrics is not None else PipelineMetrics()
+    segment_reports = _SegmentReports(overlaps, metrics, progress)
+    with context.Manager() as manager:
+        stop_event = manager.Event()
+        reports = manager.Queue()
+        with ProcessPoolExecutor(max_workers=len(segments), mp_context=context,
+                                 initializer=_init_segment_worker, initargs=(torch_threads,)) as pool:
+            futures = []
+            for k, ((start, end), segment_overlap) in enumerate(zip(segments, overlaps)):
+                # The container's frame count can be off; the last segment reads to the real end
+                num_frames = None if k == len(segments) - 1 else end - start + segment_overlap
+                futures.append(pool.submit(_detect_segment, k, video_path, start - segment_overlap, num_frames,
+                                           model_paths, settings, batch_size, track_court, stop_event, reports))
+            try:
+                while True:
+                    done, not_done = wait(futures, timeout=0.5, return_when=FIRST_EXCEPTION)
+                    segment_reports.drain(reports)
+                    if not not_done or any(future.exception() for future in done):
+                        break
+                    _check_stop(should_stop)
+                results = [future.result() for future in futures]
+            except BaseException:
+                stop_event.set()
+                for future in futures:
+                    future.cancel()
+                raise
+    return stitch_segments(results, overlaps)
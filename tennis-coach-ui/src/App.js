@@ -724,9 +724,12 @@ function App() {
       }
     } catch (error) {
       console.error('Upload error:', error);
+      const queueFull = error.response && error.response.status === 429;
       const errorMessage = {
         role: 'assistant',
-        content: 'Sorry, there was an error uploading your video. Please try again with a smaller file or different format.',
+        content: queueFull
+          ? 'The video analyzer is busy with other uploads right now. Please try again in a few minutes.'
+          : 'Sorry, there was an error uploading your video. Please try again with a smaller file or different format.',
         type: 'error'
       };
       setMessages(prev => [...prev, errorMessage]);
@@ -768,8 +771,16 @@ function App() {
           };
           setMessages(prev => [...prev, errorMessage]);
           
+        } else if (data.status === 'cancelled') {
+          const cancelledMessage = {
+            role: 'assistant',
+            content: 'Video analysis was cancelled.',
+            type: 'error'
+          };
+          setMessages(prev => [...prev, cancelledMessage]);
+          
         } else if (attempts < maxAttempts) {
-          // Still processing - continue polling
+          // Still queued or processing - continue polling
           attempts++;
           setTimeout(poll, 5000); // Poll every 5 seconds
         } else {
@@ -1,2 +1,5 @@
 from .player_tracker import PlayerTracker
-from .ball_tracker import BallTracker
\ No newline at end of file
+from .ball_tracker import BallTracker
+from .ball_motion import BallMotionModel
+from .track_store import TrackStore, load_detections, save_detections
+from .interpolation import interpolate_bboxes, StreamingInterpolator
\ No newline at end of file
@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+class BallMotionModel:
+    """Constant-velocity Kalman filter over the ball centre, in pixels per detected frame.
+
+    predict() advances the state one frame and returns the expected centre, or None when
+    there is no track. A track is dropped after max_misses frames in a row without a
+    measurement, after which the caller should search the whole frame again.
+    """
+
+    def __init__(self, max_misses=3, process_noise=1.0, measurement_noise=4.0):
+        self.max_misses = max_misses
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.reset()
+
+    def reset(self):
+        self._kalman = None
+        self.misses = 0
+
+    @property
+    def is_tracking(self):
+        return self._kalman is not None
+
+    def _start(self, center):
+        kalman = cv2.KalmanFilter(4, 2)
+        # State (x, y, vx, vy); the ball moves by its velocity every frame
+        kalman.transitionMatrix = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32)
+        kalman.measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], np.float32)
+        kalman.processNoiseCov = np.eye(4, dtype=np.float32) * self.process_noise
+        kalman.measurementNoiseCov = np.eye(2, dtype=np.float32) * self.measurement_noise
+        # Position is known, velocity isn't yet
+        kalman.errorCovPost = np.diag([self.measurement_noise, self.measurement_noise, 1000, 1000]).astype(np.float32)
+        kalman.statePost = np.array([[center[0]], [center[1]], [0], [0]], np.float32)
+        self._kalman = kalman
+        self.misses = 0
+
+    def get_state(self):
+        """Plain arrays describing the track (cv2.KalmanFilter itself can't be pickled)"""
+        if self._kalman is None:
+            return None
+        return {'state': self._kalman.statePost.copy(), 'covariance': self._kalman.errorCovPost.copy(),
+                'misses': self.misses}
+
+    def set_state(self, state):
+        self.reset()
+        if state is None:
+            return
+        self._start((0, 0))
+        self._kalman.statePost = np.asarray(state['state'], np.float32)
+        self._kalman.errorCovPost = np.asarray(state['covariance'], np.float32)
+        self.misses = state['misses']
+
+    def predict(self):
+        if self._kalman is None:
+            return None
+        state = self._kalman.predict()
+        return float(state[0, 0]), float(state[1, 0])
+
+    def correct(self, center):
+        """Feed a detection for the frame last passed to predict() (or start a new track)"""
+        if self._kalman is None:
+            self._start(center)
+            return
+        self._kalman.correct(np.array([[center[0]], [center[1]]], np.float32))
+        self.misses = 0
+
+    def miss(self):
+        """No detection this frame: coast on the prediction until max_misses, then drop the track"""
+        self.misses += 1
+        if self.misses > self.max_misses:
+            self.reset()
+
+def search_window(center, size, frame_shape):
+    """(x1, y1, x2, y2) square of side size around center, shifted (not shrunk) to fit the frame"""
+    frame_h, frame_w = frame_shape[:2]
+    width, height = min(size, frame_w), min(size, frame_h)
+    x1 = int(np.clip(center[0] - width / 2, 0, frame_w - width))
+    y1 = int(np.clip(center[1] - height / 2, 0, frame_h - height))
+    return x1, y1, x1 + width, y1 + height
@@ -1,24 +1,47 @@
 from ultralytics import YOLO 
 import cv2
-import pickle
-import pandas as pd
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import iter_frame_batches
+from .track_store import TrackStore, load_detections, save_detections
+from .interpolation import interpolate_bboxes
+from .ball_motion import BallMotionModel, search_window
+
+def ball_positions_to_array(ball_positions):
+    """Per-frame {1: bbox} dicts to an (N, 4) array with NaN rows where there's no ball"""
+    ball_bboxes = np.full((len(ball_positions), 4), np.nan)
+    store = TrackStore.from_frame_dicts(ball_positions)
+    ball_bboxes[store.frame_idx] = store.bboxes
+    return ball_bboxes
+
+def ball_array_to_positions(ball_bboxes):
+    return [{1: bbox} if not np.isnan(bbox).any() else {} for bbox in ball_bboxes.tolist()]
 
 class BallTracker:
-    def __init__(self,model_path):
-        self.model = YOLO(model_path)
-
-    def interpolate_ball_positions(self, ball_positions):
-        ball_positions = [x.get(1,[]) for x in ball_positions]
-        # convert the list into pandas dataframe
-        df_ball_positions = pd.DataFrame(ball_positions,columns=['x1','y1','x2','y2'])
-
-        # interpolate the missing values
-        df_ball_positions = df_ball_positions.interpolate()
-        df_ball_positions = df_ball_positions.bfill()
-
-        ball_positions = [{1:x} for x in df_ball_positions.to_numpy().tolist()]
-
-        return ball_positions
+    """Ball detection, optionally restricted to a motion-predicted search window.
+
+    With search_window set (a crop size in pixels, e.g. 320) the tracker follows the ball
+    with a constant-velocity Kalman filter and runs the model on a search_window square
+    around the predicted position at native resolution, instead of shrinking the whole
+    frame to the model's input size. Small balls stay several pixels wide and each frame
+    costs a fraction of a full-frame pass. Until the first detection, and again once the
+    ball has been missed for more than max_misses frames, the whole frame is searched.
+    """
+
+    conf_threshold = 0.15
+
+    def __init__(self,model_path=None, model=None, search_window=None, max_misses=3):
+        # A preloaded model (e.g. a session from pipeline.ModelRegistry) skips the disk load.
+        # With neither, no weights are loaded: filtering and drawing work, detection doesn't
+        self.model = model if model is not None or model_path is None else YOLO(model_path)
+        self.search_window = search_window
+        self.motion = BallMotionModel(max_misses=max_misses)
+
+    def interpolate_ball_positions(self, ball_positions, max_gap=None):
+        """Fill frames where the ball wasn't detected; gaps longer than max_gap stay empty"""
+        ball_bboxes = interpolate_bboxes(ball_positions_to_array(ball_positions), max_gap)
+        return ball_array_to_positions(ball_bboxes)
 
     # def get_ball_shot_frames(self,ball_positions):
     #     ball_positions = [x.get(1,[]) for x in ball_positions]
@@ -53,42 +76,96 @@ class BallTracker:
 
     #     return frame_nums_with_ball_hits
 
-    def detect_frames(self,frames, read_from_stub=False, stub_path=None):
+    def detect_frames(self,frames, read_from_stub=False, stub_path=None, batch_size=1):
         ball_detections = []
 
         if read_from_stub and stub_path is not None:
-            with open(stub_path, 'rb') as f:
-                ball_detections = pickle.load(f)
-            return ball_detections
-
-        for frame in frames:
-            player_dict = self.detect_frame(frame)
-            ball_detections.append(player_dict)
+            return load_detections(stub_path)
+
+        if batch_size > 1:
+            for batch in iter_frame_batches(frames, batch_size):
+                ball_detections.extend(self.detect_batch(batch))
+        else:
+            for frame in frames:
+                player_dict = self.detect_frame(frame)
+                ball_detections.append(player_dict)
         
         if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(ball_detections, f)
+            save_detections(ball_detections, stub_path)
         
         return ball_detections
 
     def detect_frame(self,frame):
-        results = self.model.predict(frame,conf=0.15)[0]
-
-        ball_dict = {}
-        for box in results.boxes:
-            result = box.xyxy.tolist()[0]
-            ball_dict[1] = result
-        
-        return ball_dict
+        if self.search_window:
+            return self.track_frame(frame)
+        results = self.model.predict(frame,conf=self.conf_threshold)[0]
+        return self._results_to_dict(results)
+
+    def detect_batch(self, frames, imgsz=None):
+        """Run one forward pass over a list of frames, returning one dict per frame.
+
+        In search-window mode each window depends on the previous frame's detection, so
+        the frames are tracked one at a time instead (imgsz then only affects full-frame searches).
+        """
+        if self.search_window:
+            return [self.track_frame(frame, imgsz) for frame in frames]
+        size = {'imgsz': imgsz} if imgsz else {}
+        results = self.model.predict(list(frames), conf=self.conf_threshold, verbose=False, **size)
+        return [self._results_to_dict(frame_results) for frame_results in results]
+
+    def track_frame(self, frame, imgsz=None):
+        """Search around the predicted ball position, or the whole frame when there is no track"""
+        predicted = self.motion.predict()
+        if predicted is not None:
+            x1, y1, x2, y2 = search_window(predicted, self.search_window, frame.shape)
+            results = self.model.predict(np.ascontiguousarray(frame[y1:y2, x1:x2]), conf=self.conf_threshold,
+                                         imgsz=self.search_window, verbose=False)[0]
+            bbox = self._closest_box(results, (predicted[0] - x1, predicted[1] - y1))
+            if bbox is None:
+                self.motion.miss()
+                return {}
+            bbox = [bbox[0] + x1, bbox[1] + y1, bbox[2] + x1, bbox[3] + y1]
+        else:
+            size = {'imgsz': imgsz} if imgsz else {}
+            results = self.model.predict(frame, conf=self.conf_threshold, verbose=False, **size)[0]
+            bbox = self._results_to_dict(results).get(1)
+            if bbox is None:
+                return {}
+        self.motion.correct(((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2))
+        return {1: bbox}
+
+    def get_track_state(self):
+        return self.motion.get_state()
+
+    def set_track_state(self, state):
+        self.motion.set_state(state)
+
+    def _closest_box(self, results, point):
+        if len(results.boxes) == 0:
+            return None
+        boxes = results.boxes.xyxy.cpu().numpy()
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        return boxes[np.argmin(np.hypot(*(centers - point).T))].tolist()
+
+    def _results_to_dict(self, results):
+        """{1: bbox} for the most confident ball in the frame, {} if there is none"""
+        if len(results.boxes) == 0:
+            return {}
+        best = int(results.boxes.conf.argmax())
+        return {1: results.boxes.xyxy[best].tolist()}
+
+    def draw_frame_bboxes(self, frame, ball_dict):
+        for track_id, bbox in ball_dict.items():
+            x1, y1, x2, y2 = bbox
+            cv2.putText(frame, f"Ball ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 2)
+        return frame
 
     def draw_bboxes(self,video_frames, player_detections):
         output_video_frames = []
         for frame, ball_dict in zip(video_frames, player_detections):
             # Draw Bounding Boxes
-            for track_id, bbox in ball_dict.items():
-                x1, y1, x2, y2 = bbox
-                cv2.putText(frame, f"Ball ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 2)
+            frame = self.draw_frame_bboxes(frame, ball_dict)
             output_video_frames.append(frame)
         
         return output_video_frames
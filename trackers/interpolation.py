@@ -0,0 +1,97 @@
+import numpy as np
+
+def _gap_lengths(valid):
+    """For every row, the length of the run of missing rows it sits in (0 for valid rows)"""
+    n = len(valid)
+    positions = np.arange(n)
+    prev_valid = np.maximum.accumulate(np.where(valid, positions, -1))
+    next_valid = np.minimum.accumulate(np.where(valid, positions, n)[::-1])[::-1]
+    return np.where(valid, 0, next_valid - prev_valid - 1)
+
+def interpolate_bboxes(bboxes, max_gap=None):
+    """Fill missing (NaN) rows of an (N, 4) bbox array.
+
+    Interior gaps are filled linearly, leading gaps take the first detection and trailing
+    gaps the last one, which matches the old pandas interpolate().bfill() path. Runs of
+    more than max_gap missing rows are left as NaN so long occlusions aren't invented.
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    valid = ~np.isnan(bboxes).any(axis=1)
+    if valid.all() or not valid.any():
+        return bboxes.copy()
+
+    positions = np.arange(len(bboxes))
+    valid_positions = np.flatnonzero(valid)
+    # np.interp clamps outside the known range, giving the bfill/ffill behaviour at the ends
+    filled = np.column_stack([
+        np.interp(positions, valid_positions, bboxes[valid_positions, col]) for col in range(4)
+    ])
+
+    if max_gap is not None:
+        filled[_gap_lengths(valid) > max_gap] = np.nan
+    return filled
+
+class StreamingInterpolator:
+    """interpolate_bboxes over a video delivered in chunks.
+
+    push() returns the rows that are final so far; rows in a gap that is still open are
+    held back until the next detection (or flush()) closes it. Only the last detection
+    and the length of the open gap are carried between chunks, and the concatenated
+    output equals interpolate_bboxes over the whole array.
+    """
+
+    def __init__(self, max_gap=None):
+        self.max_gap = max_gap
+        self._anchor = None     # last detection already emitted
+        self._pending = 0       # missing rows after the anchor, not yet emitted
+        self._long_gap = False  # the open gap already exceeded max_gap and was emitted as NaN
+
+    def _nan_rows(self, count):
+        return np.full((count, 4), np.nan)
+
+    def _gap_too_long(self):
+        return self.max_gap is not None and self._pending > self.max_gap
+
+    def push(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64).reshape(-1, 4)
+        out = []
+
+        if self._long_gap:
+            # Inside a gap we've given up on: missing rows go straight out as NaN
+            valid = ~np.isnan(chunk).any(axis=1)
+            if not valid.any():
+                return chunk.copy()
+            first_valid = int(np.argmax(valid))
+            out.append(chunk[:first_valid])
+            chunk = chunk[first_valid:]
+            self._long_gap = False
+
+        head = [] if self._anchor is None else [self._anchor[None]]
+        buffer = np.vstack(head + [self._nan_rows(self._pending), chunk])
+        valid = ~np.isnan(buffer).any(axis=1)
+
+        if valid.any():
+            last_valid = int(np.flatnonzero(valid)[-1])
+            filled = interpolate_bboxes(buffer[:last_valid + 1], self.max_gap)
+            out.append(filled[len(head):])
+            self._anchor = buffer[last_valid]
+            self._pending = len(buffer) - last_valid - 1
+        else:
+            self._pending = len(buffer) - len(head)
+
+        if self._gap_too_long():
+            out.append(self._nan_rows(self._pending))
+            self._pending = 0
+            self._long_gap = True
+            self._anchor = None
+
+        return np.vstack(out) if out else self._nan_rows(0)
+
+    def flush(self):
+        """Emit the trailing gap: carried forward from the last detection if it's short enough"""
+        if self._anchor is None or self._gap_too_long():
+            tail = self._nan_rows(self._pending)
+        else:
+            tail = np.repeat(self._anchor[None], self._pending, axis=0)
+        self._pending = 0
+        return tail
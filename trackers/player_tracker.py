@@ -1,63 +1,109 @@
 from ultralytics import YOLO 
+from ultralytics.trackers.basetrack import BaseTrack
 import cv2
-import pickle
+import numpy as np
 import sys
 sys.path.append('../')
-from utils import measure_distance, get_center_of_bbox
+from utils import get_foot_positions, iter_frame_batches
+from .track_store import TrackStore, load_detections, save_detections
 
 class PlayerTracker:
-    def __init__(self,model_path):
-        self.model = YOLO(model_path)
-
-    def choose_and_filter_players(self, court_keypoints, player_detections):
-        player_detections_first_frame = player_detections[0]
-        chosen_player = self.choose_players(court_keypoints, player_detections_first_frame)
-        filtered_player_detections = []
-        for player_dict in player_detections:
-            filtered_player_dict = {track_id: bbox for track_id, bbox in player_dict.items() if track_id in chosen_player}
-            filtered_player_detections.append(filtered_player_dict)
-        return filtered_player_detections
-
-    def choose_players(self, court_keypoints, player_dict):
-        distances = []
-        for track_id, bbox in player_dict.items():
-            player_center = get_center_of_bbox(bbox)
-
-            min_distance = float('inf')
-            for i in range(0,len(court_keypoints),2):
-                court_keypoint = (court_keypoints[i], court_keypoints[i+1])
-                distance = measure_distance(player_center, court_keypoint)
-                if distance < min_distance:
-                    min_distance = distance
-            distances.append((track_id, min_distance))
-        
-        # sorrt the distances in ascending order
-        distances.sort(key = lambda x: x[1])
-        # Choose the first 2 tracks
-        chosen_players = [distances[0][0], distances[1][0]]
-        return chosen_players
+    def __init__(self,model_path=None, model=None):
+        # A preloaded model (e.g. a session from pipeline.ModelRegistry) skips the disk load.
+        # With neither, no weights are loaded: filtering and drawing work, detection doesn't
+        self.model = model if model is not None or model_path is None else YOLO(model_path)
+
+    def choose_and_filter_players(self, court_keypoints, player_detections, num_players=2):
+        """Keep only the tracks of the players on court, chosen on the first frame with detections.
+
+        Accepts a TrackStore (returned filtered, as a TrackStore) or the per-frame dict list.
+        """
+        is_store = isinstance(player_detections, TrackStore)
+        store = player_detections if is_store else TrackStore.from_frame_dicts(player_detections)
+        if len(store.frame_idx) == 0:
+            return player_detections
 
+        first_frame = store.frame_idx == store.frame_idx[0]
+        chosen_players = self.closest_tracks(
+            court_keypoints, store.track_ids[first_frame], store.bboxes[first_frame], num_players
+        )
+        filtered = store.filter_tracks(chosen_players)
+        return filtered if is_store else filtered.to_frame_dicts()
 
-    def detect_frames(self,frames, read_from_stub=False, stub_path=None):
+    def choose_players(self, court_keypoints, player_dict, num_players=2):
+        track_ids = np.fromiter(player_dict.keys(), dtype=np.int64, count=len(player_dict))
+        bboxes = np.array(list(player_dict.values()), dtype=np.float64).reshape(-1, 4)
+        return self.closest_tracks(court_keypoints, track_ids, bboxes, num_players)
+
+    @staticmethod
+    def closest_tracks(court_keypoints, track_ids, bboxes, num_players=2):
+        """Track ids whose foot position is nearest to any court keypoint, nearest first"""
+        keypoints = np.asarray(court_keypoints, dtype=np.float64).reshape(-1, 2)
+        feet = get_foot_positions(bboxes)
+        # (tracks, keypoints) distance matrix, then the closest keypoint per track
+        distances = np.linalg.norm(feet[:, None, :] - keypoints[None, :, :], axis=2).min(axis=1)
+        order = np.argsort(distances, kind='stable')[:num_players]
+        return track_ids[order].tolist()
+
+
+    def detect_frames(self,frames, read_from_stub=False, stub_path=None, batch_size=1):
         player_detections = []
 
         if read_from_stub and stub_path is not None:
-            with open(stub_path, 'rb') as f:
-                player_detections = pickle.load(f)
-            return player_detections
+            return load_detections(stub_path)
 
-        for frame in frames:
-            player_dict = self.detect_frame(frame)
-            player_detections.append(player_dict)
+        if batch_size > 1:
+            for batch in iter_frame_batches(frames, batch_size):
+                player_detections.extend(self.detect_batch(batch))
+        else:
+            for frame in frames:
+                player_dict = self.detect_frame(frame)
+                player_detections.append(player_dict)
         
         if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(player_detections, f)
+            save_detections(player_detections, stub_path)
         
         return player_detections
 
     def detect_frame(self,frame):
         results = self.model.track(frame, persist=True)[0]
+        return self._results_to_dict(results)
+
+    def detect_batch(self, frames, imgsz=None):
+        """Track a list of consecutive frames in one forward pass.
+
+        Ultralytics feeds the batch results to the same persistent tracker in frame
+        order, so track IDs carry over between batches exactly as in detect_frame.
+        imgsz overrides the model's inference size (smaller is faster, misses small boxes).
+        """
+        size = {'imgsz': imgsz} if imgsz else {}
+        results = self.model.track(list(frames), persist=True, verbose=False, **size)
+        return [self._results_to_dict(frame_results) for frame_results in results]
+
+    def get_track_state(self):
+        """Picklable snapshot of the persistent tracker, for resuming detection later (None before the first frame)"""
+        trackers = getattr(self.model.predictor, 'trackers', None)
+        if trackers is None:
+            return None
+        # Older ultralytics releases number tracks from a process-wide counter
+        return {'trackers': trackers, 'id_count': BaseTrack._count}
+
+    def set_track_state(self, state):
+        """Continue from a get_track_state() snapshot: the next detect call keeps its track IDs"""
+        if state is None:
+            return
+        BaseTrack._count = max(BaseTrack._count, state['id_count'])
+        restored = []
+
+        def restore_trackers(predictor):
+            # Runs with the tracker's own on_predict_start; whichever goes first, ours wins once
+            if not restored:
+                predictor.trackers = state['trackers']
+                restored.append(True)
+
+        self.model.add_callback('on_predict_start', restore_trackers)
+
+    def _results_to_dict(self, results):
         id_name_dict = results.names
 
         player_dict = {}
@@ -72,14 +118,18 @@ class PlayerTracker:
         
         return player_dict
 
+    def draw_frame_bboxes(self, frame, player_dict):
+        for track_id, bbox in player_dict.items():
+            x1, y1, x2, y2 = bbox
+            cv2.putText(frame, f"Player ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 2)
+        return frame
+
     def draw_bboxes(self,video_frames, player_detections):
         output_video_frames = []
         for frame, player_dict in zip(video_frames, player_detections):
             # Draw Bounding Boxes
-            for track_id, bbox in player_dict.items():
-                x1, y1, x2, y2 = bbox
-                cv2.putText(frame, f"Player ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 2)
+            frame = self.draw_frame_bboxes(frame, player_dict)
             output_video_frames.append(frame)
             
         
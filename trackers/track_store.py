@@ -0,0 +1,143 @@
+import argparse
+import os
+import pickle
+import numpy as np
+
+class TrackStore:
+    """Columnar detections: one row per box, as parallel NumPy arrays.
+
+    frame_idx[i], track_ids[i] and bboxes[i] (x1, y1, x2, y2) describe row i. Rows are
+    kept sorted by frame so a frame's boxes are a contiguous slice. num_frames also
+    counts trailing frames that have no detections.
+    """
+
+    def __init__(self, frame_idx, track_ids, bboxes, num_frames=None):
+        frame_idx = np.asarray(frame_idx, dtype=np.int64)
+        track_ids = np.asarray(track_ids, dtype=np.int64)
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        if not (len(frame_idx) == len(track_ids) == len(bboxes)):
+            raise ValueError("frame_idx, track_ids and bboxes must have the same length")
+
+        if len(frame_idx) and np.any(np.diff(frame_idx) < 0):
+            order = np.argsort(frame_idx, kind='stable')
+            frame_idx, track_ids, bboxes = frame_idx[order], track_ids[order], bboxes[order]
+
+        self.frame_idx = frame_idx
+        self.track_ids = track_ids
+        self.bboxes = bboxes
+        if num_frames is None:
+            num_frames = int(frame_idx[-1]) + 1 if len(frame_idx) else 0
+        self.num_frames = num_frames
+        self._offsets = None
+
+    def __len__(self):
+        return self.num_frames
+
+    @property
+    def offsets(self):
+        """offsets[f]:offsets[f+1] is the row slice for frame f"""
+        if self._offsets is None:
+            self._offsets = np.searchsorted(self.frame_idx, np.arange(self.num_frames + 1))
+        return self._offsets
+
+    @classmethod
+    def from_frame_dicts(cls, detections):
+        """Build from the per-frame [{track_id: [x1, y1, x2, y2]}, ...] shape the trackers return"""
+        counts = np.fromiter((len(d) for d in detections), dtype=np.int64, count=len(detections))
+        total = int(counts.sum())
+        frame_idx = np.repeat(np.arange(len(detections), dtype=np.int64), counts)
+        track_ids = np.fromiter((track_id for d in detections for track_id in d), dtype=np.int64, count=total)
+        bboxes = np.array([bbox for d in detections for bbox in d.values()], dtype=np.float64).reshape(total, 4)
+        return cls(frame_idx, track_ids, bboxes, num_frames=len(detections))
+
+    def to_frame_dicts(self):
+        """Back to the per-frame dict list used by the draw and filter functions"""
+        offsets = self.offsets.tolist()
+        track_ids = self.track_ids.tolist()
+        bboxes = self.bboxes.tolist()
+        return [dict(zip(track_ids[start:end], bboxes[start:end]))
+                for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def frame(self, frame_num):
+        start, end = self.offsets[frame_num], self.offsets[frame_num + 1]
+        return dict(zip(self.track_ids[start:end].tolist(), self.bboxes[start:end].tolist()))
+
+    def unique_track_ids(self):
+        return np.unique(self.track_ids)
+
+    def filter_tracks(self, keep_track_ids):
+        """Rows belonging to keep_track_ids only, in one vectorised pass"""
+        mask = np.isin(self.track_ids, np.asarray(keep_track_ids, dtype=np.int64))
+        return TrackStore(self.frame_idx[mask], self.track_ids[mask], self.bboxes[mask], self.num_frames)
+
+    def to_arrays(self, prefix=''):
+        return {
+            f'{prefix}frame_idx': self.frame_idx,
+            f'{prefix}track_ids': self.track_ids,
+            f'{prefix}bboxes': self.bboxes,
+            f'{prefix}num_frames': np.array(self.num_frames, dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix=''):
+        return cls(arrays[f'{prefix}frame_idx'], arrays[f'{prefix}track_ids'],
+                   arrays[f'{prefix}bboxes'], int(arrays[f'{prefix}num_frames']))
+
+    def save(self, path):
+        """Write an uncompressed .npz; unlike the old pickles it can't run code when loaded"""
+        with open(path, 'wb') as f:
+            np.savez(f, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """Load a .npz written by save(); mmap=True memory-maps a directory of .npy files instead"""
+        if mmap:
+            return cls.from_arrays({name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                                    for name in ('frame_idx', 'track_ids', 'bboxes', 'num_frames')})
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls.from_arrays(arrays)
+
+    def save_npy_dir(self, path):
+        """One .npy per column so load(path, mmap=True) can page rows in on demand"""
+        os.makedirs(path, exist_ok=True)
+        for name, array in self.to_arrays().items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+
+def _npz_path(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.npz" if ext == '.pkl' else path
+
+def save_detections(detections, path):
+    """Persist per-frame detection dicts as a TrackStore .npz (a .pkl path is saved as .npz)"""
+    TrackStore.from_frame_dicts(detections).save(_npz_path(path))
+
+def load_detections(path):
+    """Per-frame detection dicts from a TrackStore .npz (a .pkl path is read as its .npz).
+
+    Legacy pickle stubs are never unpickled here, since that can run arbitrary code;
+    convert trusted ones once with `python -m trackers.track_store old_stub.pkl`.
+    """
+    npz_path = _npz_path(path)
+    if not os.path.exists(npz_path) and os.path.exists(path):
+        raise FileNotFoundError(f"{path} is a legacy pickle stub; convert it with "
+                                f"`python -m trackers.track_store {path}` if you trust its source")
+    return TrackStore.load(npz_path).to_frame_dicts()
+
+def convert_pickle_stub(path):
+    """One-off conversion of a pickle stub written by older versions into a .npz next to it"""
+    with open(path, 'rb') as f:
+        detections = pickle.load(f)
+    npz_path = f"{os.path.splitext(path)[0]}.npz"
+    save_detections(detections, npz_path)
+    return npz_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert legacy pickle detection stubs to TrackStore .npz files. "
+                                                 "Unpickling can run code: only convert stubs you created yourself.")
+    parser.add_argument('stubs', nargs='+', help='e.g. tracker_stubs/player_detections.pkl')
+    args = parser.parse_args()
+    for path in args.stubs:
+        print(f"Wrote {convert_pickle_stub(path)}")
+
+if __name__ == "__main__":
+    main()
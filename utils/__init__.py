@@ -1,2 +1,4 @@
-from .video_utils import read_video, save_video
-from .bbox_utils import get_center_of_bbox, measure_distance, get_foot_position,get_closest_keypoint_index,get_height_of_bbox,measure_xy_distance,get_center_of_bbox
\ No newline at end of file
+from .video_utils import read_video, save_video, iter_video_frames, get_video_info, iter_frame_batches, video_extension, VideoFrameWriter
+from .file_utils import file_digest
+from .sqlite_utils import SQLiteConnections
+from .bbox_utils import get_center_of_bbox, measure_distance, get_foot_position,get_foot_positions,get_closest_keypoint_index,get_height_of_bbox,measure_xy_distance,get_center_of_bbox
\ No newline at end of file
@@ -1,3 +1,4 @@
+import numpy as np
 def get_center_of_bbox(bbox):
     x1, y1, x2, y2 = bbox
     center_x = int((x1 + x2) / 2)
@@ -8,6 +9,10 @@ def measure_distance(p1,p2):
 def get_foot_position(bbox):
     x1, y1, x2, y2 = bbox
     return (int((x1 + x2) / 2), y2)
+def get_foot_positions(bboxes):
+    """Vectorised get_foot_position for an (N, 4) array, without the int rounding"""
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    return np.column_stack(((bboxes[:, 0] + bboxes[:, 2]) / 2, bboxes[:, 3]))
 
 def get_closest_keypoint_index(point, keypoints, keypoint_indices):
    closest_distance = float('inf')
@@ -0,0 +1,23 @@
+import hashlib
+import os
+import threading
+
+_digest_cache = {}
+_digest_lock = threading.Lock()
+
+def file_digest(path, chunk_size=1 << 20):
+    """sha256 of a file's content, memoised on (path, size, mtime) so weights are hashed once"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        if memo_key in _digest_cache:
+            return _digest_cache[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+    with _digest_lock:
+        _digest_cache[memo_key] = digest.hexdigest()
+    return _digest_cache[memo_key]
@@ -0,0 +1,30 @@
+import os
+import sqlite3
+import threading
+
+class SQLiteConnections:
+    """One connection per thread to a local SQLite file in WAL mode.
+
+    sqlite3 connections can't be shared between threads, and WAL lets readers in other
+    threads and worker processes carry on while one of them writes.
+    """
+
+    def __init__(self, db_path, row_factory=None, foreign_keys=False):
+        self.db_path = db_path
+        self.row_factory = row_factory
+        self.foreign_keys = foreign_keys
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if self.foreign_keys:
+                conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,148 @@
+import queue
+import shutil
+import subprocess
+import threading
+import cv2
+
+def open_capture(vid_path, start_frame=0):
+    """cv2.VideoCapture with hardware-accelerated decoding requested where OpenCV supports it.
+
+    start_frame > 0 seeks before the first read (the FFmpeg backend decodes forward from
+    the previous keyframe, so the first frame returned is start_frame itself).
+    """
+    cap = None
+    if hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+        cap = cv2.VideoCapture(str(vid_path), cv2.CAP_ANY,
+                               [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+    if cap is None or not cap.isOpened():
+        cap = cv2.VideoCapture(str(vid_path))
+    if start_frame > 0 and cap.isOpened():
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    return cap
+
+class ThreadedVideoReader:
+    """Decodes on a background thread into a bounded read-ahead queue.
+
+    cv2 releases the GIL while decoding, so the next frames are ready by the time the
+    consumer (detection, drawing) asks for them. Iterate it like a generator.
+    """
+
+    _END = object()
+
+    def __init__(self, vid_path, read_ahead=16, start_frame=0):
+        self.cap = open_capture(vid_path, start_frame)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Cannot open video: {vid_path}")
+        self._queue = queue.Queue(maxsize=read_ahead)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._decode, name='video-decode', daemon=True)
+        self._thread.start()
+
+    def _decode(self):
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self._put(frame)
+        except Exception as e:
+            self._put(e)
+        finally:
+            self.cap.release()
+            self._put(self._END)
+
+    def _put(self, item):
+        # Poll so that close() can stop a decoder blocked on a full queue
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+def find_ffmpeg():
+    """ffmpeg on PATH, else the binary bundled with the optional imageio-ffmpeg package"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg:
+        return ffmpeg
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return None
+
+def resolve_codec(codec='auto'):
+    """'h264' when an ffmpeg binary is available, otherwise the original 'mjpg' writer"""
+    if codec == 'auto':
+        return 'h264' if find_ffmpeg() else 'mjpg'
+    if codec not in CODEC_EXTENSIONS:
+        raise ValueError(f"Unknown video codec: {codec}")
+    return codec
+
+class OpenCVWriter:
+    """The original cv2.VideoWriter path (MJPG in an .avi container)"""
+
+    def __init__(self, out_path, fps, frame_size, fourcc='MJPG'):
+        w, h = frame_size
+        self._writer = cv2.VideoWriter(str(out_path), cv2.VideoWriter_fourcc(*fourcc), fps, (w, h))
+        if not self._writer.isOpened():
+            raise IOError(f"Could not open VideoWriter for {out_path}")
+
+    def write(self, frame):
+        self._writer.write(frame)
+
+    def release(self):
+        self._writer.release()
+
+class FFmpegWriter:
+    """Pipes raw BGR frames into ffmpeg for H.264 in an MP4 container.
+
+    Encoding runs in the ffmpeg process, on its own threads, so it overlaps with drawing
+    and is far smaller than MJPG at the same visual quality.
+    """
+
+    def __init__(self, out_path, fps, frame_size, crf=23, preset='veryfast'):
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise IOError("ffmpeg is not available for H.264 encoding")
+        w, h = frame_size
+        command = [
+            ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{w}x{h}', '-r', f'{fps}', '-i', '-',
+            '-an', '-c:v', 'libx264', '-preset', preset, '-crf', str(crf),
+            # yuv420p needs even dimensions; also what browsers expect
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart', str(out_path),
+        ]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame):
+        try:
+            self._process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            raise IOError(f"ffmpeg exited early: {self._process.stderr.read().decode(errors='replace')}")
+
+    def release(self):
+        self._process.stdin.close()
+        error_output = self._process.stderr.read().decode(errors='replace')
+        if self._process.wait() != 0:
+            raise IOError(f"ffmpeg failed: {error_output}")
+
+CODEC_WRITERS = {'h264': FFmpegWriter, 'mjpg': OpenCVWriter}
+CODEC_EXTENSIONS = {'h264': '.mp4', 'mjpg': '.avi'}
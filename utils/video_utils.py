@@ -1,43 +1,128 @@
 import cv2
 from pathlib import Path
-def read_video(vid_path):
-    cap = cv2.VideoCapture(str(vid_path))
+from .video_backends import ThreadedVideoReader, open_capture, resolve_codec, CODEC_WRITERS, CODEC_EXTENSIONS
+
+def iter_video_frames(vid_path, read_ahead=16, start_frame=0):
+    """Yield frames one at a time so a whole match never has to sit in memory.
+
+    With read_ahead > 0 decoding runs on a background thread that keeps up to that many
+    frames ready; read_ahead=0 decodes inline on the caller's thread. start_frame seeks
+    straight to a later frame (e.g. to resume or to process one segment of a match).
+    """
+    if read_ahead > 0:
+        frames = ThreadedVideoReader(vid_path, read_ahead=read_ahead, start_frame=start_frame)
+    else:
+        frames = _read_inline(vid_path, start_frame)
+
+    frame_count = 0
+    try:
+        for frame in frames:
+            frame_count += 1
+            yield frame
+    finally:
+        # Stops the decode thread straight away if the caller bails out early
+        frames.close()
+
+    if frame_count == 0 and start_frame == 0:
+        raise ValueError(f"No frames read from {vid_path} (file may be empty or corrupt)")
+
+def _read_inline(vid_path, start_frame=0):
+    cap = open_capture(vid_path, start_frame)
 
     if not cap.isOpened():
         raise FileNotFoundError(f"Cannot open video: {vid_path}")
 
-    frames = []
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames.append(frame)
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+def get_video_info(vid_path):
+    """Read fps, resolution and frame count from the container without decoding frames"""
+    cap = cv2.VideoCapture(str(vid_path))
 
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Cannot open video: {vid_path}")
+
+    info = {
+        'fps': cap.get(cv2.CAP_PROP_FPS) or 24,
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    }
     cap.release()
+    return info
 
-    if not frames:
-        raise ValueError(f"No frames read from {vid_path} (file may be empty or corrupt)")
+def iter_frame_batches(frames, batch_size):
+    """Group any iterable of frames into lists of at most batch_size frames"""
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_video(vid_path):
+    return list(iter_video_frames(vid_path))
 
-    return frames
+def video_extension(codec='auto'):
+    """File extension matching the container the chosen codec backend writes"""
+    return CODEC_EXTENSIONS[resolve_codec(codec)]
 
-def save_video(output_video_frames, output_video_path):
-    if not output_video_frames:
-        raise ValueError("No frames supplied to save_video()")
+class VideoFrameWriter:
+    """Writes frames to disk as they arrive instead of collecting them first.
+
+    codec='mjpg' is the original cv2 MJPG/.avi writer; 'h264' pipes into ffmpeg for a much
+    smaller .mp4; 'auto' picks h264 when an ffmpeg binary can be found.
+    """
 
-    # Make sure the output directory exists
-    out_path = Path(output_video_path).expanduser()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, output_video_path, fps=24, codec='mjpg'):
+        self.out_path = Path(output_video_path).expanduser()
+        self.fps = fps
+        self.codec = resolve_codec(codec)
+        self.frame_size = None
+        self.frames_written = 0
+        self._writer = None
 
-    h, w = output_video_frames[0].shape[:2]
-    fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-    out = cv2.VideoWriter(str(out_path), fourcc, 24, (w, h))
+    def _open(self, frame):
+        # Make sure the output directory exists
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    if not out.isOpened():
-        raise IOError(f"Could not open VideoWriter for {out_path}")
+        h, w = frame.shape[:2]
+        self.frame_size = (h, w)
+        self._writer = CODEC_WRITERS[self.codec](self.out_path, self.fps, (w, h))
 
-    for frame in output_video_frames:
-        if frame.shape[:2] != (h, w):
+    def write(self, frame):
+        if self._writer is None:
+            self._open(frame)
+        if frame.shape[:2] != self.frame_size:
             raise ValueError("All frames must have the same resolution")
-        out.write(frame)
+        self._writer.write(frame)
+        self.frames_written += 1
 
-    out.release()
+    def release(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+def save_video(output_video_frames, output_video_path, fps=24, codec='mjpg'):
+    """Encode a list or any iterable/generator of frames"""
+    with VideoFrameWriter(output_video_path, fps=fps, codec=codec) as writer:
+        for frame in output_video_frames:
+            writer.write(frame)
+
+    if writer.frames_written == 0:
+        raise ValueError("No frames supplied to save_video()")